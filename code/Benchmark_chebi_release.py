@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:47:18 2026
+
+Check and benchmark of the incremental update of the hazards of
+chebi_release_funcs.py. The snapshot of a previous ChEBI release is made in a
+temporary folder, the list of hazards of the new release is made from the
+snapshot with the incremental update and with all compounds, as
+Preprocess_chebi.py does with and without --incremental. The script stops
+with an error when the two lists are not byte-identical, and reports how
+long each of them takes and how many names the changelog adds and removes.
+"""
+
+# Import packages
+import time
+import argparse
+import tempfile
+from chebi_funcs import expand_chebi_names, select_hazards
+from chebi_release_funcs import (load_chebi_release, load_chebi_snapshot, update_chebi_rows,
+                                 write_chebi_snapshot, hazard_changelog)
+
+def expand_release(release):
+
+    return expand_chebi_names(release['NAME'].tolist(), release['COMPOUND_ID'].to_numpy())
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--previous-compounds', required = True,
+                    help = 'ChEBI compounds flat file of the previous release')
+parser.add_argument('--previous-names', required = True,
+                    help = 'ChEBI names flat file of the previous release')
+parser.add_argument('--compounds', default = '../data/chebi_compounds.tsv',
+                    help = 'ChEBI compounds flat file of the new release')
+parser.add_argument('--names', default = '../data/chebi_names.tsv',
+                    help = 'ChEBI names flat file of the new release')
+args = parser.parse_args()
+
+with tempfile.TemporaryDirectory() as snapshot_dir:
+    previous_release = load_chebi_release(args.previous_compounds, args.previous_names)
+    previous_rows = expand_release(previous_release)
+    write_chebi_snapshot(previous_release, previous_rows, select_hazards(previous_rows),
+                         snapshot_dir)
+
+    start_time = time.perf_counter()
+    release = load_chebi_release(args.compounds, args.names)
+    previous_release, previous_rows, previous_hazards = load_chebi_snapshot(snapshot_dir)
+    rows, diff = update_chebi_rows(previous_release, previous_rows, release)
+    hazards = select_hazards(rows)
+    changelog = hazard_changelog(previous_hazards, hazards)
+    write_chebi_snapshot(release, rows, hazards, snapshot_dir)
+    incremental_seconds = time.perf_counter() - start_time
+
+start_time = time.perf_counter()
+full_hazards = select_hazards(expand_release(load_chebi_release(args.compounds, args.names)))
+full_seconds = time.perf_counter() - start_time
+
+csv_text = hazards[['NAME', 'COMPOUND_ID']].to_csv(header = False, index = False)
+full_csv_text = full_hazards[['NAME', 'COMPOUND_ID']].to_csv(header = False, index = False)
+if csv_text != full_csv_text:
+    rows = csv_text.splitlines()
+    full_rows = full_csv_text.splitlines()
+    first_difference = next((index for index, (row, full_row) in enumerate(zip(rows, full_rows))
+                             if row != full_row), min(len(rows), len(full_rows)))
+    raise AssertionError('The incremental update differs from the full run from row {} on:'
+                         '\n{}\n{}'.format(first_difference,
+                                           rows[first_difference:first_difference + 3],
+                                           full_rows[first_difference:first_difference + 3]))
+
+print(', '.join('{} {} compounds'.format(len(compound_ids), change)
+                for change, compound_ids in diff.items()))
+print('{} names added, {} names removed'.format((changelog['CHANGE'] == 'added').sum(),
+                                                (changelog['CHANGE'] == 'removed').sum()))
+print('The {} hazards of the incremental update are identical to the full run'.format(
+    hazards.shape[0]))
+print('Incremental update: {:.1f} seconds'.format(incremental_seconds))
+print('Full run: {:.1f} seconds'.format(full_seconds))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:58:10 2026
+
+Golden check and benchmark of the text cleaning. The abstracts of the corpus
+and the golden texts below are cleaned with clean_text and clean_text_for_llm
+of text_cleaning_funcs.py and with the chains of str.replace and re.sub calls
+that Clean_abstracts.py and Clean_abstracts_for_LLMs.py used before, which
+are kept below as the reference. The parentheticals are removed with
+remove_parentheticals in both, its regular expression before is compared in
+Benchmark_parentheticals.py. The outputs are checked first, and the script
+stops with an AssertionError when they differ for any text. Only then
+both are timed, and the script reports how many abstracts per second each of
+them cleans.
+"""
+
+# Import packages
+import re
+import time
+import argparse
+from corpus_store_funcs import load_corpus
+from text_cleaning_funcs import clean_text, clean_text_for_llm, remove_parentheticals
+
+# Texts where the order of the rules matters, e.g. removing a tag makes a new
+# one, and the copyright rule with {0, 50}, which matches literally
+GOLDEN_TEXTS = ['<h4<b>>results</h4> were <<i>b>low</b>.',
+                '<<b>i>x</i> <su<sup>b>2</sub> <h4>a<i></h4> b</h4>',
+                '<h4>methods <h4<i>>x</h4> y</h4>end.',
+                'copyright:{0, 50} and copyright 2020 elsevier. all rights reserved.',
+                'this article is protected by copyright. all rights reserved.',
+                'levels ( 95%ci: 1.04%-45.66% ) of pcb (pcbs) ,rice.. fish  .  ©2021 x',
+                'A <i>B</i>,C (d (e) 5%) ©  Copyright <sub>x</sub>.done']
+
+def clean_text_reference(text):
+
+    '''
+    The cleaning of Clean_abstracts.py before the rules were compiled
+    '''
+
+    lower_text = text.lower()
+    no_html = (lower_text.replace("<i>", "").replace("<b>", "").
+                replace("</i>", "").replace("</b>", "").replace("<sub>", "").
+                replace("</sub>", "").replace("<sup>", "").replace("</sup>", ""))
+    no_html_2 = re.sub(r'<h4>(.*?)</h4>', r' ', no_html)
+    weird_paran_removed = remove_parentheticals(no_html_2)
+    spaces_around_comma = re.sub(r'(?<!\s),\s', r' , ', weird_paran_removed)
+    single_space = re.sub(r'\.(?!\d+|\s)', r'. ', spaces_around_comma)
+    single_space2 = re.sub(r'\s\s+(?!\.)', r' ', single_space)
+    single_space3 = re.sub(r'\s+\.', r'.', single_space2)
+    single_space4 = re.sub(r'\.\s\s+', r'. ', single_space3)
+    paranthesis_space3 = re.sub(r'(?<=\()\s+', r'', single_space4)
+    paranthesis_space4 = re.sub(r'\s+(?=\))', '', paranthesis_space3)
+    wout_copyright = re.sub("this article is protected by copyright. all rights reserved.",
+                            r'', paranthesis_space4)
+    wout_copyright2 = re.sub(r'copyright(.){0, 50}', r'', wout_copyright)
+    wout_copyright3 = re.sub(r'(copyright)*(:|\s)*©(.){0,50}', r'', wout_copyright2).strip()
+
+    return wout_copyright3
+
+def clean_text_for_llm_reference(text):
+
+    '''
+    The cleaning of Clean_abstracts_for_LLMs.py before the rules were compiled
+    '''
+
+    no_html = (text.replace("<i>", "").replace("<b>", "").
+               replace("</i>", "").replace("</b>", "").replace("<sub>", "").
+               replace("</sub>", "").replace("<sup>", "").replace("</sup>", ""))
+    no_html_2 = re.sub(r'<h4>(.*?)</h4>', r' ', no_html)
+    single_space = re.sub(r'\.(?!\d+|\s)', r'. ', no_html_2)
+    single_space2 = re.sub(r'\s\s+(?!\.)', r' ', single_space)
+    single_space3 = re.sub(r'\s+\.', r'.', single_space2)
+    single_space4 = re.sub(r'\.\s\s+', r'. ', single_space3)
+    wout_copyright = re.sub("this article is protected by copyright. all rights reserved.",
+                            r'', single_space4)
+    wout_copyright2 = re.sub(r'copyright(.){0, 50}', r'', wout_copyright)
+    wout_copyright3 = re.sub(r'(copyright)*(:|\s)*©(.){0,50}', r'', wout_copyright2).strip()
+
+    return wout_copyright3
+
+def check_cleaning(texts, function, reference):
+
+    '''
+    Asserts that the cleaning function cleans every text as the reference does
+    '''
+
+    expected = [reference(text) for text in texts]
+    cleaned = [function(text) for text in texts]
+
+    differences = [index for index, (old, new) in enumerate(zip(expected, cleaned))
+                   if old != new]
+    assert not differences, ('{} cleans {} of {} texts differently, e.g. text {}:'
+                             '\n{!r}\n{!r}'.format(
+                                 function.__name__, len(differences), len(texts),
+                                 differences[0], expected[differences[0]],
+                                 cleaned[differences[0]]))
+
+def time_cleaning(function, abstracts):
+
+    '''
+    Cleans all abstracts and gives the abstracts per second
+    '''
+
+    start_time = time.perf_counter()
+    for abstract in abstracts:
+        function(abstract)
+    seconds = time.perf_counter() - start_time
+
+    return len(abstracts) / seconds
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--corpus-dir', default = '../data/europmc_corpus',
+                    help = 'Folder of the corpus store')
+parser.add_argument('--repeat', type = int, default = 3,
+                    help = 'Number of times the timing is repeated')
+args = parser.parse_args()
+
+abstracts = load_corpus(args.corpus_dir, columns = ['abstract'])['abstract'].dropna().tolist()
+
+for function, reference in [(clean_text, clean_text_reference),
+                            (clean_text_for_llm, clean_text_for_llm_reference)]:
+    check_cleaning(GOLDEN_TEXTS + abstracts, function, reference)
+print('All {} abstracts and {} golden texts are cleaned identically'.format(
+    len(abstracts), len(GOLDEN_TEXTS)))
+
+reference_speeds = []
+speeds = []
+for _ in range(args.repeat):
+    reference_speeds.append(time_cleaning(clean_text_reference, abstracts))
+    speeds.append(time_cleaning(clean_text, abstracts))
+
+print('Before: {:.0f} abstracts per second'.format(max(reference_speeds)))
+print('After: {:.0f} abstracts per second'.format(max(speeds)))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 01:26:05 2026
+
+Check and benchmark of the notice filter of notice_filter_funcs.py. The rules
+of NOTICE_RULES are padded with patterns of four words of the corpus that
+end in a made up word, so they hardly ever match, and the abstracts of the
+corpus are filtered with the alternation, with the automaton and with a
+str.contains scan of the lowercased abstracts per pattern, as
+Clean_abstracts.py did before. The script stops with an error when they find
+notices in different abstracts, and reports how many abstracts per second
+each of them filters, for a growing number of patterns, which gives
+AUTOMATON_MIN_PATTERNS.
+"""
+
+# Import packages
+import time
+import random
+import argparse
+import pandas
+from corpus_store_funcs import load_corpus
+from notice_filter_funcs import NoticeFilter, NOTICE_RULES
+
+def padded_rules(n_patterns, words, seed = 0):
+
+    generator = random.Random(seed)
+    rules = {rule: list(patterns) for rule, patterns in NOTICE_RULES.items()}
+    rules['padding'] = []
+
+    while sum(len(patterns) for patterns in rules.values()) < n_patterns:
+        start = generator.randrange(len(words) - 4)
+        rules['padding'].append(' '.join(words[start:start + 4]) + 'xq')
+
+    return rules
+
+def scan_per_pattern(rules, abstracts):
+
+    lowered = pandas.Series(abstracts, dtype = object).str.lower()
+    found = pandas.Series(False, index = lowered.index)
+    for patterns in rules.values():
+        for pattern in patterns:
+            found |= lowered.str.contains(pattern, case = False, regex = False)
+
+    return found.tolist()
+
+def scan_notice_filter(rules, abstracts, automaton_min_patterns):
+
+    notice_filter = NoticeFilter(rules, automaton_min_patterns)
+
+    return [notice_filter.match(abstract) is not None for abstract in abstracts]
+
+def abstracts_per_second(scan, *scan_args):
+
+    start_time = time.perf_counter()
+    found = scan(*scan_args)
+
+    return found, len(abstracts) / (time.perf_counter() - start_time)
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--corpus-dir', default = '../data/europmc_corpus',
+                    help = 'Folder of the corpus store')
+parser.add_argument('--patterns', type = int, nargs = '+', default = [3, 10, 16, 30, 300, 1000],
+                    help = 'Numbers of patterns to time')
+args = parser.parse_args()
+
+abstracts = load_corpus(args.corpus_dir, columns = ['abstract'])['abstract'].dropna().tolist()
+words = ' '.join(abstracts[:1000]).lower().split()
+
+print('{:>10} {:>20} {:>20} {:>20}'.format('patterns', 'per pattern (1/s)',
+                                           'alternation (1/s)', 'automaton (1/s)'))
+for n_patterns in args.patterns:
+    rules = padded_rules(n_patterns, words)
+
+    expected, per_pattern_speed = abstracts_per_second(scan_per_pattern, rules, abstracts)
+    alternation_found, alternation_speed = abstracts_per_second(
+        scan_notice_filter, rules, abstracts, float('inf'))
+    automaton_found, automaton_speed = abstracts_per_second(
+        scan_notice_filter, rules, abstracts, 0)
+
+    for engine, found in [('alternation', alternation_found), ('automaton', automaton_found)]:
+        if expected != found:
+            raise AssertionError('The {} finds notices in other abstracts '
+                                 'with {} patterns'.format(engine, n_patterns))
+
+    print('{:>10} {:>20.0f} {:>20.0f} {:>20.0f}'.format(n_patterns, per_pattern_speed,
+                                                         alternation_speed, automaton_speed))
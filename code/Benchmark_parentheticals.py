@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 22:37:51 2026
+
+Check and benchmark of remove_parentheticals of text_cleaning_funcs.py against
+the regular expression that removed the parentheticals before. First, both
+are run on the lowercased abstracts of the corpus, where they should only
+differ for abstracts with nested parantheses, which the regular expression
+did not handle, and the script stops with an AssertionError when they differ
+for any other abstract. Then both are timed on adversarial texts of growing length
+with unbalanced parantheses. The runtime of the regular expression grows
+with the cube of the length of an unclosed parenthetical, and is already
+many times longer than that of remove_parentheticals for the short ones,
+which grows linearly with the length of the text. The regular expression is
+not run on longer texts once it has taken more than --max-seconds.
+"""
+
+# Import packages
+import re
+import time
+import argparse
+from corpus_store_funcs import load_corpus
+from text_cleaning_funcs import remove_parentheticals
+
+WEIRD_PARANTHESES = re.compile(r'\([^\)\(]*?[^\d\+\-\s\(\)(a-z))]+[^\)\(]*?\)')
+
+# Texts that make the lazy quantifiers backtrack, for a length n
+ADVERSARIAL_TEXTS = {
+    'one unclosed paranthesis': lambda n: '(' + '%' * n,
+    'unclosed parantheses': lambda n: ('(' + '%' * 99) * (n // 100),
+    'unclosed with abbreviations': lambda n: ('(pcb ' + '%' * 95) * (n // 100),
+}
+
+def remove_with_regex(text):
+
+    return WEIRD_PARANTHESES.sub('', text)
+
+def has_nested_parantheses(text):
+
+    depth = 0
+    for character in text:
+        if character == '(':
+            depth += 1
+            if depth > 1:
+                return True
+        elif character == ')' and depth > 0:
+            depth -= 1
+
+    return False
+
+def check_abstracts(abstracts):
+
+    '''
+    Asserts that remove_parentheticals changes every abstract without nested
+    parantheses as the regular expression does, and gives the number of
+    abstracts with nested parantheses that are changed differently
+    '''
+
+    nested = 0
+    for index, abstract in enumerate(abstracts):
+        if remove_with_regex(abstract) != remove_parentheticals(abstract):
+            assert has_nested_parantheses(abstract), (
+                'Abstract {} without nested parantheses is changed '
+                'differently:\n{!r}'.format(index, abstract))
+            nested += 1
+
+    return nested
+
+def time_removal(function, text):
+
+    start_time = time.perf_counter()
+    function(text)
+
+    return time.perf_counter() - start_time
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--corpus-dir', default = '../data/europmc_corpus',
+                    help = 'Folder of the corpus store')
+parser.add_argument('--max-length', type = int, default = 1024000,
+                    help = 'Length of the longest adversarial text')
+parser.add_argument('--max-seconds', type = float, default = 5,
+                    help = 'Time after which the regular expression is not run on longer texts')
+args = parser.parse_args()
+
+abstracts = [abstract.lower() for abstract in
+             load_corpus(args.corpus_dir, columns = ['abstract'])['abstract'].dropna()]
+
+nested = check_abstracts(abstracts)
+print('{} of {} abstracts are changed identically, {} abstracts with nested '
+      'parantheses differently'.format(len(abstracts) - nested, len(abstracts), nested))
+
+for name, make_text in ADVERSARIAL_TEXTS.items():
+    print('\n' + name)
+    print('{:>10} {:>14} {:>14}'.format('length', 'regex (s)', 'scanner (s)'))
+    regex_too_slow = False
+    length = 250
+    while length <= args.max_length:
+        text = make_text(length)
+        regex_seconds = None if regex_too_slow else time_removal(remove_with_regex, text)
+        scanner_seconds = time_removal(remove_parentheticals, text)
+        print('{:>10} {:>14} {:>14.4f}'.format(
+            length, '-' if regex_seconds is None else '{:.4f}'.format(regex_seconds),
+            scanner_seconds))
+        regex_too_slow = regex_too_slow or regex_seconds > args.max_seconds
+        length *= 2
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 02:48:31 2026
+
+Regression check and benchmark of the ChEBI preprocessing. The ChEBI files
+are preprocessed with chebi_funcs.py as Preprocess_chebi.py does, and the
+csv text is compared with the --reference csv file of the version before a
+change to the filter plans or the expansions. Make it by running that
+version of Preprocess_chebi.py with e.g. --output
+../data/hazards_reference.csv. The reference has to be another file than the
+hazards_preprocessed.csv that Preprocess_chebi.py writes by default, as that
+one is overwritten by every run of the new version. The script stops with an AssertionError when the two are not byte-identical,
+showing the first rows that differ, and reports how long the loading and the
+preprocessing take.
+"""
+
+# Import packages
+import os
+import time
+import argparse
+from chebi_funcs import load_chebi_names, preprocess_chebi_names
+
+# Default output of Preprocess_chebi.py
+PIPELINE_OUTPUT = '../data/hazards_preprocessed.csv'
+
+def check_hazards(processed_chebi, reference_path):
+
+    '''
+    Asserts that the csv text of the preprocessed hazards is byte-identical
+    to the csv file of an earlier run
+    '''
+
+    csv_text = processed_chebi[['NAME', 'COMPOUND_ID']].to_csv(header = False, index = False)
+    with open(reference_path, encoding = 'utf-8', newline = '') as f:
+        reference_text = f.read()
+
+    rows = csv_text.splitlines()
+    reference_rows = reference_text.splitlines()
+    first_difference = next((index for index, (row, reference_row)
+                             in enumerate(zip(rows, reference_rows))
+                             if row != reference_row),
+                            min(len(rows), len(reference_rows)))
+    assert csv_text == reference_text, (
+        'The preprocessed hazards differ from {} from row {} on, {} rows instead '
+        'of {}:\n{}\n{}'.format(reference_path, first_difference, len(rows),
+                                len(reference_rows),
+                                rows[first_difference:first_difference + 3],
+                                reference_rows[first_difference:first_difference + 3]))
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--compounds', default = '../data/chebi_compounds.tsv',
+                    help = 'ChEBI compounds flat file')
+parser.add_argument('--names', default = '../data/chebi_names.tsv',
+                    help = 'ChEBI names flat file')
+parser.add_argument('--reference', required = True,
+                    help = 'Csv file of the version before the change to compare with')
+args = parser.parse_args()
+
+if os.path.abspath(args.reference) == os.path.abspath(PIPELINE_OUTPUT):
+    raise ValueError('The reference {} is the output of Preprocess_chebi.py, which every run '
+                     'of the new version overwrites'.format(args.reference))
+if not os.path.exists(args.reference):
+    raise FileNotFoundError('There is no reference csv file at {}'.format(args.reference))
+
+start_time = time.perf_counter()
+names, ids = load_chebi_names(args.compounds, args.names)
+load_time = time.perf_counter()
+processed_chebi = preprocess_chebi_names(names, ids)
+end_time = time.perf_counter()
+
+check_hazards(processed_chebi, args.reference)
+
+print('The {} preprocessed hazards are identical to {}'.format(
+    processed_chebi.shape[0], args.reference))
+print('Loading: {:.1f} seconds'.format(load_time - start_time))
+print('Preprocessing: {:.1f} seconds'.format(end_time - load_time))
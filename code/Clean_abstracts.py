@@ -4,109 +4,122 @@ Written by @ozen002.
 Do some text cleaning operations on the collected abstracts before we create 
 a dataframe of tokens with some other their linguistic properties in the other
 columns. 
+
+The same filtered abstracts are also cleaned for the LLM, closer to natural 
+language in its written form, and both variants are written next to each other
+to abstracts_clean.parquet, so they always have the same doc_ids. Use 
+load_clean_abstracts of corpus_store_funcs.py to read one of them.
+
+With --streaming, a large corpus is cleaned in chunks by a pool of processes,
+see clean_abstracts_funcs.py. The abstracts are then written in doc_id order 
+instead of in the order of their length.
+
+Abstracts that are near duplicates of an abstract with a lower doc_id, e.g. the
+preprint and the journal version of an article, are dropped as well, see 
+near_duplicate_funcs.py. Their Jaccard similarity is estimated on the word 
+shingles of the cleaned abstracts, and the dropped ones are listed with the 
+abstract they are a duplicate of in near_duplicate_clusters.csv.
+
+Abstracts that are notices, such as corrections, retractions and amendments, 
+are dropped with the rules of notice_filter_funcs.py or of the csv file given 
+with --notice-rules, and listed with the rule that fired in 
+notice_filter_report.csv.
 """
 
 #Libraries
-import re
-import numpy
-import pandas
-
-def clean_text(text): 
-    
-    '''
-    Does cleaning operations on filtered abstracts before they are tokenized 
-    and a dataframe containing all tokens in the corpus is built
-    '''
-    
-    lower_text = text.lower() 
-    
-    #Remove HTML tags around the text 
-    #Notice that we replace all tags with empty string without any space
-    no_html = (lower_text.replace("<i>", "").replace("<b>", "").
-                replace("</i>", "").replace("</b>", "").replace("<sub>", "").
-                replace("</sub>", "").replace("<sup>", "").replace("</sup>", ""))
-    
-    #Make sure that this is not a greedy capture
-    no_html_2 = re.sub(r'<h4>(.*?)</h4>', r' ', no_html)
-    
-    #Match any pattern wrapped in a parantheses if it contains something
-    #that is not a letter, a number, a plus, a minus or space 
-    #We allow for these to keep potential abbreviations of chemicals that 
-    #are in a paranthesis
-    #We also do not accept an inner set of parantheses within outer parantheses 
-    #to prevent greedy matches
-    #A sample expression that we would want to remove: (95%ci: 1.04%-45.66%)
-    #But it fails to remove cases such as (odds ratio (or) 10, 95% confidence interval (ci))
-    #It would also match (95% confidence interval (ci)) and substitute it with 
-    #empty string only with the last closing paranthesis remaining 
-    weird_paran_removed = re.sub(r'\([^\)\(]*?[^\d\+\-\s\(\)(a-z))]+[^\)\(]*?\)', 
-                                 r'', no_html_2)
-    
-    #Comma should have spaces on both sides in case they do not
-    spaces_around_comma = re.sub(r'(?<!\s),\s', r' , ', weird_paran_removed)
-    
-    #There should be single spaces between tokens. If there is a period, it
-    #should not have a space on its left side. 
-    single_space = re.sub(r'\.(?!\d+|\s)', r'. ', spaces_around_comma)
-    single_space2 = re.sub(r'\s\s+(?!\.)', r' ', single_space)
-    single_space3 = re.sub(r'\s+\.', r'.', single_space2)
-    single_space4 = re.sub(r'\.\s\s+', r'. ', single_space3)
-    
-    #Also make sure that the opening parantheses do not have space after and
-    #closing parantheses do not have space before themselves. 
-    paranthesis_space3 = re.sub(r'(?<=\()\s+', r'', single_space4)
-    paranthesis_space4 = re.sub(r'\s+(?=\))', '', paranthesis_space3)
-    
-    #Remove the copyright declarations at the end of abstract.
-    wout_copyright = re.sub("this article is protected by copyright. all rights reserved.", 
-                            r'', paranthesis_space4)
-
-    #We introduce character limit that can follow the keyword copyright or
-    #copyright sign because otherwise we can delete copyright and everything that 
-    #follows because it is mentioned in an abstract
-    wout_copyright2 = re.sub(r'copyright(.){0, 50}', r'', wout_copyright)
-    wout_copyright3 = re.sub(r'(copyright)*(:|\s)*©(.){0,50}', r'', wout_copyright2).strip()
-    
-    return wout_copyright3
-
-# Import data
-articles = pandas.read_csv("../data/europmc_abstracts_food_safety_2023_bioaccum_incl.csv", 
-                           on_bad_lines = 'warn', header = None)
-
-# Specify column names
-articles.columns = ['query', 'doi', 'title', 'abstract', 'year']
-articles['doc_id'] = numpy.arange(0, articles.shape[0])
-
-# Drop NaN entry and duplicated abstracts 
-articles.dropna(subset = 'abstract', inplace = True)
-articles.drop_duplicates(['abstract'], inplace = True)
-
-# Also drop duplicates in terms of doi, make sure it does not consider NaN doi's
-# as duplicates
-articles = articles[(~articles['doi'].duplicated()) | (articles['doi'].isna())]
-
-# Sort articles according to their length
-articles['abstract_len'] = articles['abstract'].map(lambda x: len(str(x)))
-articles_sorted = articles.sort_values(by = 'abstract_len', ascending = True)
-
-# Remove the ones that are shorter than 60 characters - definitely
-articles_sorted = articles_sorted.loc[articles_sorted.abstract_len > 60]
-
-# Remove the ones which contain some sort of correction, amendment etc. 
-articles_sorted = articles_sorted.loc[~((articles_sorted.abstract.str.lower().str.contains(
-    'this corrects the article', case = False)) |
-                                        (articles_sorted.abstract.str.lower().str.contains(
-                                            'this retracts the article', case = False)) |
-                                        (articles_sorted.abstract.str.lower().str.contains(
-                                            'an amendment to this paper', case = False)))]
+import argparse
+from corpus_store_funcs import load_corpus, write_clean_abstracts
+from text_cleaning_funcs import clean_text, clean_text_for_llm
+from clean_abstracts_funcs import clean_corpus_streaming, notice_report
+from near_duplicate_funcs import find_near_duplicates, summarize_near_duplicates
+from notice_filter_funcs import NoticeFilter, load_notice_rules, NOTICE_RULES
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streaming', action = 'store_true',
+                        help = 'Clean the corpus in chunks with a pool of processes')
+    parser.add_argument('--processes', type = int, default = None,
+                        help = 'Number of processes of the streaming mode, all cores by default')
+    parser.add_argument('--chunk-size', type = int, default = 10000,
+                        help = 'Number of abstracts that a process cleans at a time')
+    parser.add_argument('--near-duplicate-threshold', type = float, default = 0.8,
+                        help = 'Jaccard similarity from which an abstract is a near duplicate')
+    parser.add_argument('--keep-near-duplicates', action = 'store_true',
+                        help = 'Do not drop the near duplicates')
+    parser.add_argument('--notice-rules', default = None,
+                        help = 'Csv file with the rule and pattern of every notice to drop')
+    args = parser.parse_args()
+
+    threshold = None if args.keep_near_duplicates else args.near_duplicate_threshold
+    notice_rules = (NOTICE_RULES if args.notice_rules is None 
+                    else load_notice_rules(args.notice_rules))
+
+    if args.streaming:
+        rows_written, notices, near_duplicates = clean_corpus_streaming(
+            '../data/europmc_corpus', '../data/abstracts_clean.parquet',
+            processes = args.processes, chunk_size = args.chunk_size,
+            near_duplicate_threshold = threshold, notice_rules = notice_rules)
+        print('{} abstracts are cleaned'.format(rows_written))
+        notices.to_csv('../data/notice_filter_report.csv', index = False)
+        if threshold is not None:
+            near_duplicates.to_csv('../data/near_duplicate_clusters.csv', index = False)
+            print(summarize_near_duplicates(near_duplicates))
+
+    else:
+        # Import data from the corpus store, in the order the articles were harvested
+        # The row ids of the store are the doc_ids, so they stay the same when an 
+        # incremental harvest adds articles to the store
+        articles = load_corpus('../data/europmc_corpus', 
+                               columns = ['query', 'doi', 'title', 'abstract', 'year', 'row_id'])
+        articles.rename(columns = {'row_id': 'doc_id'}, inplace = True)
+
+        # Drop NaN entry and duplicated abstracts 
+        articles.dropna(subset = 'abstract', inplace = True)
+        articles.drop_duplicates(['abstract'], inplace = True)
+
+        # Also drop duplicates in terms of doi, make sure it does not consider NaN doi's
+        # as duplicates
+        articles = articles[(~articles['doi'].duplicated()) | (articles['doi'].isna())]
+
+        # Sort articles according to their length
+        articles['abstract_len'] = articles['abstract'].map(lambda x: len(str(x)))
+        articles_sorted = articles.sort_values(by = 'abstract_len', ascending = True)
+
+        # Remove the ones that are shorter than 60 characters - definitely
+        articles_sorted = articles_sorted.loc[articles_sorted.abstract_len > 60]
+
+        # Remove the ones which contain some sort of correction, amendment etc. 
+        # All patterns are found in a single scan of every abstract
+        notice_filter = NoticeFilter(notice_rules)
+        notices = [notice_filter.match(abstract) for abstract in articles_sorted['abstract']]
+        notice_report([(doc_id, *notice) for doc_id, notice in zip(articles_sorted['doc_id'], notices)
+                       if notice is not None]).to_csv('../data/notice_filter_report.csv', 
+                                                      index = False)
+        articles_sorted = articles_sorted.loc[[notice is None for notice in notices]]
   
-#Drop abstract_len column helping us doing the filters above
-articles_sorted.drop(['abstract_len'], axis = 1, inplace = True)
+        #Drop abstract_len column helping us doing the filters above
+        articles_sorted.drop(['abstract_len'], axis = 1, inplace = True)
+
+        # Reset index 
+        articles_sorted.reset_index(drop = True, inplace = True)
+
+        articles_sorted['clean_abstract'] = articles_sorted['abstract'].map(
+            lambda x: clean_text(x))
+        articles_sorted['clean_abstract_llm'] = articles_sorted['abstract'].map(
+            lambda x: clean_text_for_llm(x))
 
-# Reset index 
-articles_sorted.reset_index(drop = True, inplace = True)
+        # Drop the near duplicates, keeping the abstract with the lowest doc_id
+        if threshold is not None:
+            near_duplicates = find_near_duplicates(articles_sorted['doc_id'], 
+                                                   articles_sorted['clean_abstract'],
+                                                   threshold)
+            near_duplicates.to_csv('../data/near_duplicate_clusters.csv', index = False)
+            print(summarize_near_duplicates(near_duplicates))
+            articles_sorted = articles_sorted[
+                ~articles_sorted['doc_id'].isin(near_duplicates['doc_id'])].reset_index(drop = True)
 
-articles_sorted['clean_abstract'] = articles_sorted['abstract'].map(
-    lambda x: clean_text(x))
+        write_clean_abstracts(articles_sorted, '../data/abstracts_clean.parquet')
 
-articles_sorted.to_csv('../data/abstracts_clean.csv', index = None)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
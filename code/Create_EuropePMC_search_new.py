@@ -5,10 +5,13 @@ Created on Thu Apr 13 18:09:52 2023
 @author: ozen002
 
 Code to generate queries to search in EuropePMC, code originally written by
-Leonieke vd Bulk and modified for purposes of this project
+Leonieke vd Bulk and modified for purposes of this project. Next to the list
+of queries, a query plan is saved which covers the same cross product with a
+few larger OR-combined queries, see query_funcs.py.
 """
 # Import packages
 import pandas as pd
+from query_funcs import build_query, plan_queries
 
 # NERIS - Create the queries by combining chemical hazard terms with public health
 # terms - these query terms come from the literature research terms that were
@@ -29,25 +32,18 @@ public_health = ['public health', 'haccp', 'consumer protection', 'consumer*',
 # Note that %20 should be used instead of a space in these queries
 queries = []
 for pub_h in public_health:
-    if(" " in pub_h):
-        pub_h_space_repl = '"' + pub_h.replace(" ", "%20") + '"'
-    
-    else:
-        pub_h_space_repl = pub_h
-    
     for chem_h in chem_hazard: 
-        if (" " in chem_h): 
-            chem_h_space_repl = '"' + chem_h.replace(" ", "%20") + '"'
-    
-        else:
-            chem_h_space_repl = chem_h
-    
-        queries.append("(ABSTRACT:{}%20OR%20TITLE:{}%20OR%20KW:{})%20AND%20"
-                       "(ABSTRACT:{}%20OR%20TITLE:{}%20OR%20KW:{})"
-                       .format(pub_h_space_repl, pub_h_space_repl, pub_h_space_repl,
-                               chem_h_space_repl, chem_h_space_repl, chem_h_space_repl))
+        queries.append(build_query([pub_h], [chem_h]))
     
 # Save the queries as a csv
 queries_df = pd.DataFrame(queries)
 queries_df.to_csv('../data/query_search_list_EuropePMC.csv', 
                   index = False, header = None)
+
+# Save the plan, the covered column holds the row numbers of the queries 
+# above that are combined in the planned query
+plan = plan_queries(public_health, chem_hazard)
+plan_df = pd.DataFrame([(planned_query, ';'.join(str(i) for i in covered))
+                        for planned_query, covered in plan], 
+                       columns = ['planned_query', 'covered'])
+plan_df.to_csv('../data/query_plan_EuropePMC.csv', index = False)
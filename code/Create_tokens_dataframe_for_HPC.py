@@ -10,10 +10,11 @@ along with some document, sentence ids and linguistic properties
 
 import time
 import pandas as pd
+from corpus_store_funcs import load_clean_abstracts
 from text_processing_funcs import abstract_to_tidy_Neris
 
 #Read in articles / abstracts
-articles = pd.read_csv('../data/abstracts_clean.csv')
+articles = load_clean_abstracts('../data/abstracts_clean.parquet')
 
 idd = articles.doc_id.values
 
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:41:13 2026
+
+Script to evaluate a set of EuropePMC queries locally on the stored corpus,
+without sending them to the server. The title, abstract and keywords of the
+corpus are put in an inverted index once, see CorpusIndex in query_funcs.py,
+after which every query, with its ABSTRACT/TITLE/KW terms and * truncation,
+is a few lookups in that index. This can be used to try out a new set of
+queries, or to slice the corpus by query. Note that the server also searches
+synonyms of the terms, so it can find a few more articles than the local
+evaluation.
+
+The number of articles per query is written to local_query_hits.csv and the
+row ids (the doc_ids) of the articles of every query to local_query_rows.csv.
+"""
+
+# Import packages
+import time
+import argparse
+import pandas as pd
+from query_funcs import CorpusIndex
+from corpus_store_funcs import load_corpus
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--queries', default = '../data/query_search_list_EuropePMC.csv',
+                    help = 'Csv file without header with a query per line')
+parser.add_argument('--corpus-dir', default = '../data/europmc_corpus',
+                    help = 'Folder of the corpus store')
+args = parser.parse_args()
+
+queries = pd.read_csv(args.queries, header = None)[0].tolist()
+
+start_time = time.time()
+articles = load_corpus(args.corpus_dir,
+                       columns = ['row_id', 'title', 'abstract', 'keywords'])
+corpus_index = CorpusIndex(articles)
+index_time = time.time()
+
+rows_per_query = corpus_index.select(queries)
+end_time = time.time()
+
+print('Indexed {} articles in {:.2f} seconds'.format(articles.shape[0],
+                                                    index_time - start_time))
+print('Evaluated {} queries in {:.1f} milliseconds'.format(
+    len(queries), (end_time - index_time) * 1000))
+
+pd.DataFrame({'query': queries,
+              'hits': [len(rows) for rows in rows_per_query]}).to_csv(
+    '../data/local_query_hits.csv', index = False)
+
+pd.DataFrame({'query_id': [query_id for query_id, rows in enumerate(rows_per_query)
+                           for _ in rows],
+              'row_id': [row_id for rows in rows_per_query for row_id in rows]}).to_csv(
+    '../data/local_query_rows.csv', index = False)
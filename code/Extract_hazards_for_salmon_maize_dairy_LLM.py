@@ -9,6 +9,7 @@ to evaluate
 """
 
 from prompts_to_eval import simple_prompt, step_by_step_prompt, pseudocode_prompt
+from corpus_store_funcs import load_clean_abstracts
 from auto_gptq import AutoGPTQForCausalLM, BaseQuantizeConfig
 from transformers import AutoTokenizer, logging
 import pandas as pd
@@ -47,7 +48,8 @@ model.eval()
 logging.set_verbosity(logging.CRITICAL) 
 
 #Bring all abstracts - we will filter them out
-clean_abs = pd.read_csv('../data/abstracts_clean_for_llm.csv')
+clean_abs = load_clean_abstracts('../data/abstracts_clean.parquet',
+                                 variant = 'llm')
 
 #Read the token_dat_object that we filtered previously
 token_df = pd.read_csv("../data/token_df_object_filt_for_vecs.csv", 
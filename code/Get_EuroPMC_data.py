@@ -5,112 +5,115 @@ Created on Thu Apr 13 20:51:21 2023
 @author: ozen002
 
 Script to collect information on journal articles from EuroPMC based on given queries.
+The queries are harvested concurrently, see europepmc_funcs.py, and the rows
+are written query by query as when the queries are run one by one. With
+--resume, a harvest that was interrupted continues from its checkpoint journal.
+Only articles published up to the cutoff date are requested, and queries with
+more than --max-slice-hits hits are paged in parallel date slices.
+With --plan, the few OR-combined queries of the query plan are harvested instead
+and every article is attributed locally to the first original query it matches.
+With --cache, the responses are kept on disk, and --replay rebuilds the output
+from those cached responses without any network access. Requests are rate
+limited to --max-rate per second, which backs off when the server throttles,
+and failed requests are retried. With --two-phase, the pages are fetched as
+lite records and the core records (with the abstract) are only fetched for
+articles that were not written before. The articles are written to the
+Parquet corpus store europmc_corpus, a file per page with the query and year,
+together with the ids of all queries that found each article.
+With --incremental, only the articles published since the last completed
+harvest are fetched, up to today, and added to the corpus store. The articles
+published before that were updated since the last harvest are fetched again
+and overwrite their rows. The doc_ids of the new and the updated articles are
+in the last run of europmc_harvest_state.json, see new_row_ids and
+updated_row_ids.
 
 Code originally written by Leonieke vd Bulk. 
 """
 
 # Import packages
-import json
 import time
-import requests
+import datetime
+import argparse
 import pandas as pd
+from europepmc_funcs import harvest_queries, EUROPEPMC_SEARCH_URL, PUBLICATION_CUTOFF
+from query_funcs import parse_query, matching_queries
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--max-concurrency', type = int, default = 8, 
+                    help = 'Number of queries that are paged at the same time')
+parser.add_argument('--max-slice-hits', type = int, default = 10000, 
+                    help = 'Queries with more hits are split into date slices')
+parser.add_argument('--base-url', default = EUROPEPMC_SEARCH_URL, 
+                    help = 'Url of the search endpoint, e.g. a local stub for testing')
+parser.add_argument('--resume', action = 'store_true', 
+                    help = 'Continue from the checkpoint journal of an interrupted run')
+parser.add_argument('--plan', action = 'store_true', 
+                    help = 'Harvest the planned queries from query_plan_EuropePMC.csv')
+parser.add_argument('--cache', action = 'store_true', 
+                    help = 'Keep the responses in europmc_http_cache')
+parser.add_argument('--replay', action = 'store_true', 
+                    help = 'Rebuild the output from europmc_http_cache only')
+parser.add_argument('--max-rate', type = float, default = 10, 
+                    help = 'Maximum number of requests per second')
+parser.add_argument('--max-retries', type = int, default = 5, 
+                    help = 'Number of times a failed request is tried again')
+parser.add_argument('--timeout', type = float, default = 120, 
+                    help = 'Seconds after which a request is given up')
+parser.add_argument('--two-phase', action = 'store_true', 
+                    help = 'Only fetch core records of articles that are new')
+parser.add_argument('--incremental', action = 'store_true', 
+                    help = 'Only add articles published since the last harvest')
+args = parser.parse_args()
 
 # Set path to csv file contaning EuroPMC queries
 queries = pd.read_csv('../data/query_search_list_EuropePMC.csv', header = None).to_numpy()
+original_queries = [q[0] for q in queries]
 
-# Set boolean for the query to initialize new output file and initialize
-# an empty dataframe to store all the data
-initialize_file = True
-data_df = pd.DataFrame(columns=['Query', 'DOI', 'Title', 'Abstract', 'PubYear'])
-
-start_time = time.time()
-
-for q in queries:
+if(args.plan):
     
-    # Get the query as a string and set the page as * to indicate the first page
-    query = q[0]
-    cMark = "*"
-    last_page = False
+    # The planned queries cover the same cross product, so we only need to 
+    # find out locally which original queries an article matches. Articles
+    # that only match through synonyms on the server keep the planned query.
+    harvested_queries = pd.read_csv('../data/query_plan_EuropePMC.csv')['planned_query'].tolist()
+    parsed_queries = [parse_query(query) for query in original_queries]
+    
+    def attribute(result, planned_query):
+        queries = matching_queries(result, original_queries, parsed_queries)
+        return queries if queries else [planned_query]
+    
+else:
+    harvested_queries = original_queries
+    attribute = None
 
-    # Loop over the pages until it is the final one
-    while(not last_page):
-        
-        # Send a http request to the REST webservice (ask for json format)
-        uri = 'https://www.ebi.ac.uk/europepmc/webservices/rest/search?query={}&resultType=core&synonym=TRUE&cursorMark={}&pageSize=1000&format=json'.format(query, cMark)
-        req = requests.get(uri)
-        body = req.text
-        
-        # Parse the json file
-        json_dict = json.loads(body)
-        page_data = []
-        
-        # Loop over the articles in the page and get the DOI, title, abstract
-        # and pubyear
-        for result in json_dict['resultList']['result']:
-            
-            #NERIS - Do not accept abstracts later than April 2, 2023 for 
-            #reproducibility of the results
-            parse_pub_date = [int(str_number) for str_number in result[
-                'firstPublicationDate'].split('-')]
-            
-            if parse_pub_date[0] > 2023:
-                continue
+# A replay can only read from the cache
+if(args.cache or args.replay):
+    cache_dir = '../data/europmc_http_cache'
+else:
+    cache_dir = None
 
-            elif (parse_pub_date[0] == 2023) & (parse_pub_date[1] > 4): 
-                continue
+# The full harvest is frozen at the cutoff date for reproducibility, an 
+# incremental harvest keeps the corpus up to date
+if(args.incremental):
+    end_date = datetime.date.today().isoformat()
+else:
+    end_date = PUBLICATION_CUTOFF
 
-            elif (parse_pub_date[0] == 2023) & (parse_pub_date[1] == 4) & (parse_pub_date[2] > 2): 
-                continue
+start_time = time.time()
 
-            else: 
-                result_row = []
-                result_row.append(query)
-                
-                if('doi' in result):
-                    result_row.append(result['doi'])
-                else:
-                    result_row.append('')
-                
-                if('title' in result):
-                    result_row.append(result['title'])
-                else:
-                    result_row.append('')
-                
-                if('abstractText' in result):
-                    result_row.append(result['abstractText'])
-                else:
-                    result_row.append('')
-                
-                if('pubYear' in result):
-                    result_row.append(result['pubYear'])
-                else:
-                    result_row.append('')
-                
-                # Append the data to our list
-                page_data.append(result_row)
-        
-        # Change the list to a pandas dataframe and compare for duplicates
-        page_df = pd.DataFrame(page_data, columns=['Query', 'DOI', 'Title', 'Abstract', 'PubYear'])
-        duplicates = page_df['DOI'].isin(data_df['DOI'])
-        page_df.drop(page_df[duplicates].index, inplace=True)
-        data_df = pd.concat([data_df, page_df], ignore_index = True)
-        
-        # If it is the first query, initialize file and write to it. Otherwise,
-        # just append to the file.
-        if(initialize_file):
-            page_df.to_csv('../data/europmc_abstracts_food_safety_2023_bioaccum_incl.csv', 
-                            index = False, header = False)
-            initialize_file = False
-        else:
-            page_df.to_csv('../data/europmc_abstracts_food_safety_2023_bioaccum_incl.csv', 
-                            index = False, header = False, mode = 'a') 
-        
-        # Check if we are on the last page by checking the nextCursorMark
-        if(not 'nextCursorMark' in json_dict):
-            last_page = True
-        else:
-            cMark = json_dict['nextCursorMark']
+report = harvest_queries(harvested_queries, '../data/europmc_corpus',
+                       '../data/europmc_harvest_checkpoint.json', 
+                       '../data/europmc_doi_index.txt', resume = args.resume,
+                       max_concurrency = args.max_concurrency, 
+                       max_slice_hits = args.max_slice_hits, base_url = args.base_url,
+                       attribute = attribute, cache_dir = cache_dir, replay = args.replay,
+                       client_options = {'max_rate': args.max_rate, 
+                                         'max_retries': args.max_retries,
+                                         'timeout': args.timeout},
+                       two_phase = args.two_phase, query_list = original_queries,
+                       state_path = '../data/europmc_harvest_state.json',
+                       incremental = args.incremental, end_date = end_date)
 
 end_time = time.time()
+print(report)
 print('It has taken {} minutes to run the first part'.format(
     (end_time - start_time) / 60))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:48:02 2026
+
+Script to build the corpus from the gzipped XML dumps of the EuropePMC open
+access subset (https://europepmc.org/ftp/oa/) instead of from the REST search
+webservice, see europepmc_bulk_funcs.py. The dump files in --dump-dir are
+parsed in parallel by --processes processes, the queries of
+query_search_list_EuropePMC.csv are evaluated locally on the title, abstract
+and keywords, and the matching articles published up to the cutoff date are
+written to a corpus store with the same schema and provenance as the harvest
+of Get_EuroPMC_data.py. Use --corpus-dir ../data/europmc_corpus to clean
+these articles with Clean_abstracts.py instead of the harvested ones.
+
+Note that the webservice also searches synonyms of the terms, which the local
+evaluation does not, and that the open access subset is only a part of all
+articles in EuropePMC.
+"""
+
+# Import packages
+import os
+import glob
+import time
+import argparse
+import pandas as pd
+from europepmc_bulk_funcs import ingest_dumps
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dump-dir', default = '../data/europmc_oa_dumps',
+                        help = 'Folder with the .xml.gz dump files')
+    parser.add_argument('--corpus-dir', default = '../data/europmc_bulk_corpus',
+                        help = 'Folder of the corpus store that is written')
+    parser.add_argument('--processes', type = int, default = os.cpu_count(),
+                        help = 'Number of dump files that are parsed at the same time')
+    args = parser.parse_args()
+
+    queries = pd.read_csv('../data/query_search_list_EuropePMC.csv', header = None)[0].tolist()
+
+    dump_paths = sorted(glob.glob(os.path.join(args.dump_dir, '*.xml.gz')))
+    if not dump_paths:
+        raise FileNotFoundError('No .xml.gz dump files in {}'.format(args.dump_dir))
+
+    start_time = time.time()
+
+    rows_written = ingest_dumps(dump_paths, args.corpus_dir, queries,
+                                processes = args.processes)
+
+    end_time = time.time()
+    print('{} articles from {} dump files'.format(rows_written, len(dump_paths)))
+    print('It has taken {} minutes to ingest the dumps'.format(
+        (end_time - start_time) / 60))
+
+if __name__ == '__main__':
+    main()
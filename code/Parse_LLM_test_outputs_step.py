@@ -15,6 +15,7 @@ performance also better or comparable to pseudocode prompt
 import pandas as pd
 import ast
 import re
+from corpus_store_funcs import load_clean_abstracts
 
 #Define a custom function to implemented row-wise in a dataframe of
 #responses so that if a chemical from a response is in abbreviation form
@@ -72,7 +73,8 @@ dairy_df = pd.read_csv('../data/llm_outputs_dairy.csv')
 maize_df = pd.read_csv('../data/llm_outputs_maize.csv')
 salmon_df = pd.read_csv('../data/llm_outputs_salmon.csv')
 
-llm_clean_abst_df = pd.read_csv('../data/abstracts_clean_for_llm.csv')
+llm_clean_abst_df = load_clean_abstracts('../data/abstracts_clean.parquet',
+                                         variant = 'llm')
 
 chem_df = pd.read_csv('../data/hazards_preprocessed.csv', 
                       header = None)
@@ -11,6 +11,7 @@ and shellfish so that we can measure performance
 import pandas as pd
 import ast
 import re
+from corpus_store_funcs import load_clean_abstracts
 
 #Define a custom function to check if pseudo response has the desirable format - 
 #returns a boolean datatype
@@ -150,7 +151,8 @@ def from_abbv_to_longer(row):
 
 #Bring in inputs
 leafy_df = pd.read_csv('../data/llm_outputs_leafy.csv')
-llm_clean_abst_df = pd.read_csv('../data/abstracts_clean_for_llm.csv')
+llm_clean_abst_df = load_clean_abstracts('../data/abstracts_clean.parquet',
+                                         variant = 'llm')
 chem_df = pd.read_csv('../data/hazards_preprocessed.csv', 
                       header = None)
 
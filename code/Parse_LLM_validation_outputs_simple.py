@@ -11,6 +11,7 @@ so that we can measure performance especially precision wise
 import pandas as pd
 import ast
 import re
+from corpus_store_funcs import load_clean_abstracts
 
 #Define a custom function to implemented row-wise in a dataframe of
 #responses so that if a chemical from a response is in abbreviation form
@@ -68,7 +69,8 @@ def from_abbv_to_longer(row):
 leafy_df = pd.read_csv('../data/llm_outputs_leafy.csv')
 shellfish_df = pd.read_csv('../data/llm_outputs_shellfish.csv')
 
-llm_clean_abst_df = pd.read_csv('../data/abstracts_clean_for_llm.csv')
+llm_clean_abst_df = load_clean_abstracts('../data/abstracts_clean.parquet',
+                                         variant = 'llm')
 
 chem_df = pd.read_csv('../data/hazards_preprocessed.csv', 
                       header = None)
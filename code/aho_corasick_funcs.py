@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 01:52:40 2026
+
+This script contains an Aho-Corasick automaton, which finds all of a set of
+literal patterns in a text with a single scan, whatever the number of
+patterns. It is used for the notices among the abstracts, see
+notice_filter_funcs.py, and for the class words among the ChEBI names, see
+chebi_funcs.py. The automaton runs over bytes, so the UTF-8 encoded text can
+be marked with bytes that never occur in UTF-8, e.g. to find a pattern only
+at the start or the end of a text.
+"""
+
+from collections import deque
+
+class AhoCorasickAutomaton:
+
+    '''
+    Automaton of a list of (label, pattern) pairs, where the patterns are
+    bytes. The trie of the patterns is made into a complete transition table,
+    with a row of 256 next states per state, by following the failure links
+    once when the automaton is built, so the scan takes a single lookup per
+    byte.
+    '''
+
+    def __init__(self, labelled_patterns):
+
+        self.patterns = list(labelled_patterns)
+        self.label_names = list(dict.fromkeys(label for label, _ in self.patterns))
+        label_bits = {label: 1 << bit for bit, label in enumerate(self.label_names)}
+
+        # The trie of the patterns, with the patterns that end in every state
+        goto = [{}]
+        outputs = [[]]
+        for pattern_id, (_, pattern) in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                if byte not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].append(pattern_id)
+
+        # Breadth first, so the row of the failure state of a state is
+        # complete when the state is reached
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = [goto[0].get(byte, 0) for byte in range(256)]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            row = list(transitions[fail[state]])
+            for byte, child in goto[state].items():
+                fail[child] = transitions[fail[state]][byte]
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                row[byte] = child
+                queue.append(child)
+            transitions[state] = row
+
+        self.transitions = transitions
+        self.first_outputs = [output[0] if output else None for output in outputs]
+
+        # The labels of the patterns that end in every state, as bits
+        self.label_masks = []
+        for output in outputs:
+            mask = 0
+            for pattern_id in output:
+                mask |= label_bits[self.patterns[pattern_id][0]]
+            self.label_masks.append(mask)
+
+    def first_match(self, data):
+
+        '''
+        Gives the (label, pattern) pair of the first pattern that ends in the
+        bytes, or None when no pattern is in them
+        '''
+
+        transitions = self.transitions
+        first_outputs = self.first_outputs
+        state = 0
+
+        for byte in data:
+            state = transitions[state][byte]
+            if first_outputs[state] is not None:
+                return self.patterns[first_outputs[state]]
+
+        return None
+
+    def labels(self, data):
+
+        '''
+        Gives the set of labels of all patterns that are in the bytes
+        '''
+
+        transitions = self.transitions
+        label_masks = self.label_masks
+        state = 0
+        mask = 0
+
+        for byte in data:
+            state = transitions[state][byte]
+            mask |= label_masks[state]
+
+        return {label for bit, label in enumerate(self.label_names) if mask >> bit & 1}
@@ -0,0 +1,617 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 02:07:13 2026
+
+This script contains the functions of Preprocess_chebi.py, which makes the
+list of possible hazards from the ChEBI names. The names go through a few
+filter plans, which drop names, or all names of a compound, that are classes
+of compounds or too generic, and through expansions, which add variants of
+the names as synonyms. The expansions are the rules of a table, which run as
+substitutions over the column of all names at once. The rules that drop a
+name because it contains a word of a class of compounds, starts with a prefix
+such as anti or ends with a suffix such as rna are compiled into a single
+Aho-Corasick automaton, see aho_corasick_funcs.py, so a name is scanned once
+instead of once per word. The other stages of a filter plan are hash lookups
+and boolean masks over all names at once.
+"""
+
+import re
+import warnings
+import numpy
+import pandas
+from aho_corasick_funcs import AhoCorasickAutomaton
+
+# Bytes that never occur in UTF-8, to mark the start and the end of a name
+NAME_START = b'\xff'
+NAME_END = b'\xfe'
+
+# Some entries are only mentioned with the word 'compound', 'agent', 'group' etc. 
+# behind it, we can remove them, because they are classes of compounds, not 
+# compounds themselves. Some words below have a space added in front or after 
+# the word (atom, steroid, substituted, crown), because these words can also be
+# subwords of actual compounds.
+IRRELEVANT_WORDS = ['compound', 'agent', 'drug', 'entity', 'entities', 'group',
+                    'derivative' 'conjugate', 'agonist', 'antagonist', 
+                    'modulator', 'pesticide', 'acaricide', 'insecticide', 
+                    ' atom', 'atoms', 'molecule', 'inhibitor', 'cluster', 'anion', 
+                    ' steroid', '-steroid', 'steroids', 'steroides', 
+                    'fungicide', 'safener', 'fatty acid', ' lipids', 
+                    'glycolipid', 'metabolite', 'catalyst', 'adjutant', 'element', 
+                    'chemical', 'medication', 'primary', 'secondary', 
+                    'tertiary', 'quaternary', 'biogenic', 'substituted ', 
+                    'amino acid', 'crown ', 'atomic', 'contaminant', 'nutrient', 
+                    'sacchar', 'residue', 'pharmaceutical', 'depressant', 
+                    'mimetic', 'poison', 'hormon', 'herbicide', ' parent', 
+                    'nucleo', 'lytic', 'congestant', 'psychoti', 'refrigerant', 
+                    'microbicide', 'leptic','lator', 'stimulant', 'septic', 
+                    'food', 'carcinogen', 'plastic', 'stabili', 'surfactant', 
+                    'nutrient', 'rodenticides', 'polymer', 'explosive', 'material', 
+                    'sweetener','disruptor', 'blocker', 'blocks', 
+                    'blockader', 'receptor', 'orchestra', 'adjuvant', 'reductant',
+                    'oxidant', 'narcotic', 'cosmetic', 'allergen', 'solution', 
+                    'acceptor', 'analogue', 'radical', 'replace', 'carrier', 
+                    'pathway', 'testing', 'hello', 'example', 'unknown', 
+                    'mineral', 'mixture', 'thyroid', 'extract', 'ligand', 'buffer', 
+                    'tracer', 'venom', ' label', 'repel', 'glass', ' alloy', 
+                    ' donor', '-donor', 'fuel', 'metal ', ' metal', 'metallic',
+                    'sugar', 'wurcs', 'indicator']
+
+# If the name of the hazard is exactly one of the names listed in the irrelevant
+# list with spaces around dropped, then drop the hazard on the basis of its ID
+IRRELEVANT_NAMES = {irrelevant.strip(' ') for irrelevant in IRRELEVANT_WORDS}
+
+# Names that start with anti and steroid are also groups, e.g. antioxidant
+CLASS_PREFIXES = ['anti', 'steroid']
+
+# The compounds with a name that ends with rna are RNAs
+RNA_SUFFIXES = ['rna']
+
+# Names looked up to drop on the basis of their IDs are determined after some 
+# results were obtained for leafy greens and were deemed to be irrelevant or 
+# too generic
+GENERIC_NAMES_BY_ID = ['polystyrene', 'ester', 'polyester', 'ion', 'emulsifier', 
+                       'biological function', 'solvent', 'essential oil', 'fertilizer', 
+                       'biomarker', 'dietary supplement', 'bile acid', 'virulence factor', 
+                       'disinfectant', 'antigen', 'urea', 'cellulose', 'organic acid']
+
+GENERIC_NAMES_BY_ID.extend([entity + 's' for entity in GENERIC_NAMES_BY_ID])
+
+# Names that are dropped on the basis of their names - because we do not expect
+# them to be problematic on their ID-basis but the names allude to generic 
+# concepts because they are abbreviations or brand names
+GENERIC_NAMES = ['authority', 'home', 'homes', 'same', 'ages']
+
+# Single-word entries that are not hazards, are too general or also mean 
+# something else. Many of these words were chosen by checking them against
+# words in the english dictionary. 
+NOT_HAZARD_WORDS = ['all', 'has', 'can','aim', 'alls', 'bes', 'man', 'adi', 'edi', 'protein', 
+                    'proteins', 'impurity', 'impurities', 'toxin', 'toxins', 'water', 'h20', 
+                    'ltd', 'one', 'plateau', 'impose', 'beyond', 'oxygen', 'effector', 
+                    'beta', 'alpha', 'inorganics', 'common', 'image', 'commons', 'acid', 
+                    'acids', 'rest', 'light', 'light green', 'transform', 'ion', 'ionen', 'iode',
+                    'iones', 'did', 'dids', 'yellow', 'null', 'biological role', 'electron', 
+                    'cofactor', 'salt', 'neutron', 'positron', 'nucleus', 'nucleon', 
+                    'steroid hormone', 'short-chain fatty aldehyde', 'psychedelics',
+                    'amine', 'atom', 'steroid', 'hold', 'access', 'deep', 'anthelmintic',
+                    'anthelmintics', 'unclassifieds', 'application', 'bactericide', 
+                    'bactericides', 'anaesthetics', 'anesthetics', 'commotional', 'antimetabolite',
+                    'propellants', 'emulsifiers', 'emulgents', 'emulgent', 'vulnerary',
+                    'astringent', 'diuretics', 'medicament', 'farmaco', 'neurotoxin', 
+                    'fertiliser', 'fertilisers', 'avicides', 'purgatives', 'purgative',
+                    'aperients', 'aperient', 'megaphone', 'fragrance', 'endocrine', 'adrenergics',
+                    'anxiolytics', 'ataractics', 'milestone', 'ballistic', 'humectants',
+                    'vitamin', 'vitamins', 'plexiglas', 'styrofoam', 'reducer', 'reducers',
+                    'oxidizer', 'oxidizers', 'oxidiser', 'oxidisers', 'racemates', 'preserval',
+                    'defoamer', 'defoamers', 'charcoal', 'pigment', 'pigments', 'depigmentor',
+                    'depigmentors', 'negatron', 'alcohol', 'alcohols', 'proclaim', 'filler',
+                    'fillers', 'pressor', 'pressors', 'stampede', 'velocity', 'castaway',
+                    'deadline', 'defender', 'clearcast', 'raptor', 'beyond', 'vulture',
+                    'prestige', 'prestage', 'trigger', 'mini-pill', 'minipill', 'reposal',
+                    'essence', 'perfume', 'parfum', 'scent', 'aroma', 'arome', 'android',
+                    'asphalt', 'clipper', 'roundup', 'verdict', 'stipend', 'scepter',
+                    'stirrup', 'prophecy', 'prophecies', 'relaxin', 'retinal', 'ionomer',
+                    'ionomers', 'voltage', 'boltage', 'counter', 'balance', 'divinyl',
+                    'bivinyl', 'vinyl', 'steward', 'pegasus', 'pectin', 'pectins', 'ionones',
+                    'prosper', 'impulse', 'vulvate', 'aminate', 'tenuate', 'celsius',
+                    'proton', 'sandal', 'torque', 'formal', 'letter', 'blazer', 'corona',
+                    'patrol', 'condor', 'action', 'assert', 'dagger', 'empire', 'merlin',
+                    'manage', 'muster', 'autumn', 'tartar', 'squill', 'spray-tox', 'serval',
+                    'gemini', 'cypher', 'factor', 'patrol', 'aurora', 'cohort', 'reflex',
+                    'parlay', 'aplace', 'versed', 'equity', 'stevia', 'finish', 'stench',
+                    'talbot', 'antara', 'tempo', 'probe', 'gamma','arena', 'terra',
+                    'theta', 'glean', 'rogue', 'dozer', 'clove', 'anana', 'green', 
+                    'greens', 'double green', 'basic blue', 'medic', 'boson', 'quark',
+                    'pipe', 'pipes', 'lipid', 'lipids', 'base', 'bases', 'basen', 'amino',
+                    'epoxy', 'sales', 'cuban', 'flash', 'henna', 'homes', 'rally', 'midas',
+                    'salsa', 'cinch', 'nylon', 'hello', 'lilly', 'lacto', 'ring assembly',
+                    'ring assemblies', 'ring', 'rings', 'role', 'roles', 'papa', 'test', 
+                    'tests', 'dump', 'camp', 'camps', 'damp', 'nonmetal', 'metal',
+                    'metals', 'male', 'lime', 'muse', 'peep', 'peek', 'chop', 'pope', 'mope',
+                    'mold', 'nape', 'dean', 'fame', 'cape', 'snap', 'nova', 'decaps', 'aura',
+                    'gulf', 'tram', 'type', 'leap', 'sits', 'lost', 'dyes', 'tech', 'aqua',
+                    'perk', 'avid', 'bore', 'pete', 'stam', 'chic', 'rump', 'mess', 'sage',
+                    'bold', 'keto', 'chap', 'fat', 'wax', 'cpu', 'him', 'dec', 'mon', 'ash',
+                    'pee', 'pea', 'pan', 'mad', 'org', 'int', 'ski']
+
+# Names shorter than this are dropped
+MIN_NAME_LENGTH = 4
+
+# Number of rows of the ChEBI files that are read at once
+CHUNK_SIZE = 100000
+
+# The group references of a replacement, e.g. \1
+REPLACEMENT_GROUP = re.compile(r'\\(\d+)')
+
+MULTIPLE_SPACES = re.compile(r' +')
+TRAILING_SPACE = re.compile(r' $')
+ARTICLE = re.compile(r"^an?\s(.+)")
+
+# The expansion rules add variants of the names as synonyms. Every rule is a
+# regular expression substitution on the names that match the match pattern,
+# which is kept when the synonym has the minimum length. The rules of a stage run
+# in the order of the table, so a new variant is a new row. The stages are:
+# - dashes: add the chemicals that contain dashes in the name (e.g. 
+#   13-acetyl-deoxynivalenol) also without the dash (e.g. 
+#   13-acetyldeoxynivalenol), only for dashes connecting two words, not words 
+#   and numbers
+# - elements: in order to make the element and its number combination more 
+#   robust, we add all possible combinations (e.g. polonium-210 -> 
+#   polonium210, polonium 210, 210-polonium, 210 polonium, polonium)
+# - versions: make versions of compounds also more robust and add all versions
+#   (e.g. mycotoxin b1 -> mycotoxin b-1, mycotoxin b 1, b1 mycotoxin, 
+#   mycotoxin etc.)
+# - plurals: make sure to add both the plural and singular forms, and since 
+#   they are compounds we will just use the added 's' at the end for plural,
+#   if a compound ends in a version, the compound before it is made plural
+# The patterns of the expansion rules, with the cheaper patterns that tell
+# which names a rule applies to. The patterns of a stage that only runs the
+# first rule that matches span the whole name, with scoped flags, and have
+# groups that all take part in a match, as they are searched for together,
+# see first_rule_synonyms.
+DASHED_WORDS = r"[a-z]{3}-[a-z]{3}"
+LAST_DASH = r"(.*[a-z]{3,})-([a-z]{3,}.*)"
+ELEMENT_NUMBER = r"^([a-z]+)\s*\-*(\d+)$"
+NUMBER_ELEMENT = r"^(\d+)\s*\-*([a-z]+)$"
+VERSION = r"[a-z]\s[a-z]{1,2}\s*\-*\d{1,2}$"
+COMPOUND_VERSION = r"([a-z]+)\s([a-z]{1,2})\s*\-*(\d{1,2})$"
+PLURAL_BEFORE_VERSION = r"^(?s:(.{4,}))s(\s[a-z]{1,2}\s*\-*\d{1,2}$\n?)\Z"
+BEFORE_VERSION = r"^(?s:(.*))(\s[a-z]{1,2}\s*\-*\d{1,2}$\n?)\Z"
+PLURAL = r"^(\D{3,}[^\d ])s\Z"
+SINGULAR = r"^(?s:(.{4,}[^s]))\Z"
+
+EXPANSION_RULES = [
+    # stage, rule, match, pattern, replacement, minimum length
+    ('dashes', 'join words', DASHED_WORDS, LAST_DASH, r"\1\2", 0),
+    ('elements', 'element-number', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\1-\2", 0),
+    ('elements', 'elementnumber', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\1\2", 0),
+    ('elements', 'number-element', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\2-\1", 0),
+    ('elements', 'numberelement', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\2\1", 0),
+    ('elements', 'element number', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\1 \2", 0),
+    ('elements', 'number element', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\2 \1", 0),
+    ('elements', 'element', ELEMENT_NUMBER, ELEMENT_NUMBER, r"\1", 3),
+    ('elements', 'number-element', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\1-\2", 0),
+    ('elements', 'numberelement', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\1\2", 0),
+    ('elements', 'element-number', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\2-\1", 0),
+    ('elements', 'elementnumber', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\2\1", 0),
+    ('elements', 'number element', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\1 \2", 0),
+    ('elements', 'element number', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\2 \1", 0),
+    ('elements', 'element', NUMBER_ELEMENT, NUMBER_ELEMENT, r"\2", 3),
+    ('versions', 'compound version-number', VERSION, COMPOUND_VERSION, r"\1 \2-\3", 0),
+    ('versions', 'compound version number', VERSION, COMPOUND_VERSION, r"\1 \2 \3", 0),
+    ('versions', 'compound versionnumber', VERSION, COMPOUND_VERSION, r"\1 \2\3", 0),
+    ('versions', 'version-number compound', VERSION, COMPOUND_VERSION, r"\2-\3 \1", 0),
+    ('versions', 'version number compound', VERSION, COMPOUND_VERSION, r"\2 \3 \1", 0),
+    ('versions', 'versionnumber compound', VERSION, COMPOUND_VERSION, r"\2\3 \1", 0),
+    ('versions', 'compound', VERSION, COMPOUND_VERSION, r"\1", 0),
+    ('plurals', 'singular with version', PLURAL_BEFORE_VERSION, PLURAL_BEFORE_VERSION, r"\1\2", 0),
+    ('plurals', 'plural with version', BEFORE_VERSION, BEFORE_VERSION, r"\1s\2", 0),
+    ('plurals', 'singular', PLURAL, PLURAL, r"\1", 0),
+    ('plurals', 'plural', SINGULAR, SINGULAR, r"\1s", 0)]
+
+# How the rules of a stage run: 'all' adds the synonyms of all rules that
+# match a name, 'first' only the one of the first rule that matches and
+# 'repeat' runs the first rule that matches again on the synonym, until no
+# rule matches anymore, e.g. for names with multiple dashes
+EXPANSION_MODES = {'dashes': 'repeat', 'elements': 'all', 'versions': 'all',
+                   'plurals': 'first'}
+
+# The columns of the key that gives the order of the rows as the stages made
+# them: the stages that made a synonym as bits, the row of the ChEBI name it
+# is made from and the order of the rule and the round in every stage. A
+# synonym comes after the rows of the stages before it and after the rows
+# made from earlier rows in the same stage, so sorting the rows on these
+# columns gives back the order of the stages, also for rows that were made
+# in different runs
+ROW_KEY_DTYPE = numpy.dtype([('STAGES', 'int8'), ('ORIGIN', 'int32')] +
+                            [(stage.upper(), 'int16') for stage in EXPANSION_MODES])
+ROW_KEY_COLUMNS = list(ROW_KEY_DTYPE.names)
+
+class NameRules:
+
+    '''
+    The word, prefix and suffix rules of the ChEBI names in one automaton.
+    The labels of the rules that fired are kept per name, so a name that is
+    looked at again in a later stage is not scanned again.
+    '''
+
+    def __init__(self, words, prefixes, suffixes):
+
+        self.suffix_patterns = [re.compile(r'^.*' + re.escape(suffix) + '$')
+                                for suffix in suffixes]
+        self.automaton = AhoCorasickAutomaton(
+            [('word', word.encode('utf-8')) for word in words] +
+            [('prefix', NAME_START + prefix.encode('utf-8')) for prefix in prefixes] +
+            [('suffix', suffix.encode('utf-8') + NAME_END) for suffix in suffixes] +
+            [('newline', b'\n')])
+        self.name_labels = {}
+        self.label_sets = {}
+
+    def labels(self, name):
+
+        labels = self.name_labels.get(name)
+        if labels is None:
+            labels = frozenset(self.automaton.labels(
+                NAME_START + name.encode('utf-8') + NAME_END))
+            labels = self.label_sets.setdefault(labels, labels)
+            self.name_labels[name] = labels
+
+        return labels
+
+    def is_class_name(self, name):
+
+        '''
+        Tells if the name contains one of the words or starts with one of the
+        prefixes
+        '''
+
+        labels = self.labels(name)
+
+        return 'word' in labels or 'prefix' in labels
+
+    def has_suffix(self, name):
+
+        '''
+        Tells if the name ends with one of the suffixes, as the regular
+        expression ^.*suffix$ does, which does not match a name with a newline
+        before the suffix and does match one with a newline after it
+        '''
+
+        labels = self.labels(name)
+        if 'newline' in labels:
+            return any(pattern.search(name) for pattern in self.suffix_patterns)
+
+        return 'suffix' in labels
+
+def read_chebi_names(path, id_column, chunk_size = CHUNK_SIZE):
+
+    '''
+    Reads only the NAME and the identifier column of a ChEBI flat file, in
+    chunks of rows, and gives the lowercased names and a list with an array
+    of the identifiers per chunk, as 32 bit integers without the CHEBI: of
+    the accessions
+    '''
+
+    names = []
+    id_chunks = []
+    for chunk in pandas.read_csv(path, delimiter = '\t', usecols = [id_column, 'NAME'],
+                                 dtype = object, na_filter = False, chunksize = chunk_size):
+        names.extend(chunk['NAME'].str.lower().tolist())
+        id_chunks.append(chunk[id_column].str.replace('CHEBI:', '', regex = False)
+                         .astype('int32').to_numpy())
+
+    return names, id_chunks
+
+def load_chebi_names(compounds_path, names_path, chunk_size = CHUNK_SIZE):
+
+    '''
+    Gives the lowercased names and the identifiers of the compounds of the
+    ChEBI compounds file followed by those of the synonyms of the names file,
+    the identifiers as an array of 32 bit integers
+    '''
+
+    compound_names, compound_ids = read_chebi_names(compounds_path, 'CHEBI_ACCESSION', chunk_size)
+    synonyms, synonym_ids = read_chebi_names(names_path, 'COMPOUND_ID', chunk_size)
+
+    return compound_names + synonyms, numpy.concatenate(compound_ids + synonym_ids)
+
+def is_short(name):
+
+    return len(name) < MIN_NAME_LENGTH
+
+def run_filter_plan(names, ids, plan):
+
+    '''
+    Runs the stages of a filter plan on the names and their identifiers and
+    gives the boolean mask of the kept rows. A stage is a pair of an action
+    and a set of names or a function of a name that tells if a name is one
+    of them. The action 'drop names' drops the rows with these names and
+    'drop ids' drops all rows of the identifiers that have one of these names
+    among the rows that are still kept. Every stage works on the distinct
+    names and identifiers only, with a hash lookup or a single call per
+    distinct name, and on boolean masks over all rows.
+    '''
+
+    name_codes, unique_names = pandas.factorize(numpy.asarray(names, dtype = object))
+    id_codes, unique_ids = pandas.factorize(ids)
+    keep = numpy.ones(len(names), dtype = bool)
+
+    for action, selection in plan:
+        if callable(selection):
+            selected = numpy.fromiter(map(selection, unique_names), dtype = bool,
+                                      count = len(unique_names))
+        else:
+            selected = pandas.Index(unique_names).isin(selection)
+        selected_rows = selected[name_codes]
+
+        if action == 'drop names':
+            keep &= ~selected_rows
+        elif action == 'drop ids':
+            dropped_ids = numpy.zeros(len(unique_ids), dtype = bool)
+            dropped_ids[id_codes[keep & selected_rows]] = True
+            keep &= ~dropped_ids[id_codes]
+        else:
+            raise ValueError('Unknown action {} in the filter plan'.format(action))
+
+    return keep
+
+def apply_mask(keep, *columns):
+
+    return tuple(column[keep] if isinstance(column, numpy.ndarray) else
+                 [value for value, kept in zip(column, keep) if kept]
+                 for column in columns)
+
+def contains(column, pattern):
+
+    # The patterns have groups for the substitutions, which pandas warns about
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        return column.str.contains(pattern).to_numpy(dtype = bool)
+
+def substituted_synonyms(column, stage_rules, mode):
+
+    '''
+    Gives the position of the rule, the mask of the names and the synonyms
+    of every rule of a stage that runs all rules or repeats the first one
+    that matches. Every rule is a str.contains of its match pattern and a
+    str.replace of its pattern over the names it matches.
+    '''
+
+    matches = {}
+    unmatched = numpy.ones(len(column), dtype = bool)
+
+    for rule_order, (_, match, pattern, replacement, _) in enumerate(stage_rules):
+        # All rules of a stage see all names, and the rules with the same
+        # match pattern share the matches, otherwise a rule only sees the
+        # names that no rule before it matched
+        if mode == 'all':
+            if match.pattern not in matches:
+                matches[match.pattern] = contains(column, match)
+            matched = matches[match.pattern]
+        else:
+            matched = numpy.zeros(len(column), dtype = bool)
+            matched[unmatched] = contains(column[unmatched], match)
+            unmatched &= ~matched
+        if not matched.any():
+            continue
+
+        yield rule_order, matched, column[matched].str.replace(pattern, replacement, regex = True)
+
+def first_rule_synonyms(column, stage_rules):
+
+    '''
+    Gives the position of the rule, the mask of the names and the synonyms
+    of every rule of a stage that only runs the first rule that matches a
+    name. The patterns of the rules are searched for in a single str.extract
+    of their alternation, which tries them in the order of the table, the
+    first group of a rule tells that it matched and the synonyms are put
+    together from the groups of the rule.
+    '''
+
+    offsets = numpy.cumsum([0] + [pattern.groups for _, _, pattern, _, _ in stage_rules])
+    groups = column.str.extract('^(?:{})'.format('|'.join(
+        pattern.pattern for _, _, pattern, _, _ in stage_rules))).to_numpy(dtype = object)
+
+    for rule_order, (_, _, _, replacement, _) in enumerate(stage_rules):
+        matched = pandas.notna(groups[:, offsets[rule_order]])
+        if not matched.any():
+            continue
+
+        # The replacement is taken apart in its literals and group numbers
+        parts = REPLACEMENT_GROUP.split(replacement)
+        rule_groups = groups[matched]
+        synonyms = numpy.full(len(rule_groups), parts[0], dtype = object)
+        for group, literal in zip(parts[1::2], parts[2::2]):
+            synonyms = synonyms + rule_groups[:, offsets[rule_order] + int(group) - 1] + literal
+
+        yield rule_order, matched, pandas.Series(synonyms, dtype = object)
+
+def expand_names(names, ids, rules, keys, stage):
+
+    '''
+    Adds the synonyms that the expansion rules of a stage of EXPANSION_RULES
+    make from the names, together with the array of their identifiers, the
+    rule of every name, which is empty for a name of ChEBI itself and
+    otherwise the rules that produced the synonym, separated by ' > ', and
+    the structured array of the keys of the rows, see ROW_KEY_DTYPE. Every
+    rule is a regular expression substitution that runs over the column of
+    the distinct names that match its match pattern at once, and the
+    synonyms of a distinct name are shared by all its rows. The synonyms are
+    put in the order of the names they are made from and then of the rules,
+    so they come after all names as they did when the names were expanded
+    one by one.
+    '''
+
+    stage_rules = [('{}: {}'.format(stage, rule), re.compile(match), re.compile(pattern),
+                    replacement, min_length)
+                   for rule_stage, rule, match, pattern, replacement, min_length
+                   in EXPANSION_RULES if rule_stage == stage]
+    mode = EXPANSION_MODES[stage]
+
+    name_codes, unique_names = pandas.factorize(numpy.asarray(names, dtype = object))
+    column = pandas.Series(unique_names, dtype = object)
+    positions = numpy.arange(len(unique_names))
+    expansions = []
+    sequence = 0
+
+    while len(column) > 0:
+        round_synonyms = []
+
+        if mode == 'first':
+            rule_synonyms = first_rule_synonyms(column, stage_rules)
+        else:
+            rule_synonyms = substituted_synonyms(column, stage_rules, mode)
+
+        for rule_order, matched, synonyms in rule_synonyms:
+            rule, _, _, _, min_length = stage_rules[rule_order]
+            long_enough = (synonyms.str.len() >= min_length).to_numpy(dtype = bool)
+            round_synonyms.append((positions[matched][long_enough],
+                                   numpy.full(long_enough.sum(), sequence + rule_order),
+                                   synonyms[long_enough].tolist(),
+                                   rule))
+
+        sequence += len(stage_rules)
+        expansions.extend(round_synonyms)
+
+        # A stage that repeats runs its rules again on the synonyms of the
+        # last round, until no rule matches anymore
+        if mode != 'repeat' or not round_synonyms:
+            break
+        positions = numpy.concatenate([synonym_positions for synonym_positions, _, _, _ in round_synonyms])
+        column = pandas.Series([synonym for _, _, round_names, _ in round_synonyms
+                                for synonym in round_names], dtype = object)
+
+    if not expansions:
+        return names, ids, rules, keys
+
+    synonym_positions = numpy.concatenate([expansion[0] for expansion in expansions])
+    synonym_orders = numpy.concatenate([expansion[1] for expansion in expansions])
+    order = numpy.lexsort((synonym_orders, synonym_positions))
+    synonym_names = numpy.array([synonym for expansion in expansions for synonym in expansion[2]],
+                                dtype = object)[order]
+    synonym_rules = numpy.array([expansion[3] for expansion in expansions for _ in expansion[2]],
+                                dtype = object)[order]
+    synonym_orders = synonym_orders[order]
+
+    # The synonyms of every row are the range of the synonyms of its distinct
+    # name
+    unique_counts = numpy.bincount(synonym_positions, minlength = len(unique_names))
+    unique_starts = numpy.cumsum(unique_counts) - unique_counts
+    row_counts = unique_counts[name_codes]
+    positions = numpy.repeat(numpy.arange(len(names)), row_counts)
+    offsets = numpy.arange(len(positions)) - numpy.repeat(numpy.cumsum(row_counts) - row_counts,
+                                                          row_counts)
+    synonyms = unique_starts[name_codes[positions]] + offsets
+    expand_list_name = synonym_names[synonyms].tolist()
+
+    # The rules of the synonyms made from the same rules are one string
+    chains = {}
+    expand_list_rule = [chains.setdefault((source_rule, rule),
+                                          source_rule + ' > ' + rule if source_rule else rule)
+                        for source_rule, rule in zip(numpy.array(rules, dtype = object)[positions],
+                                                     synonym_rules[synonyms])]
+
+    expand_keys = keys[positions]
+    expand_keys['STAGES'] |= 1 << list(EXPANSION_MODES).index(stage)
+    expand_keys[stage.upper()] = synonym_orders[synonyms]
+
+    return (names + expand_list_name, numpy.concatenate([ids, ids[positions]]),
+            rules + expand_list_rule, numpy.concatenate([keys, expand_keys]))
+
+def expand_chebi_names(names, ids, origins = None):
+
+    '''
+    Filters and expands the lowercased ChEBI names and their identifiers.
+    Gives a dataframe with the NAME, COMPOUND_ID and expansion RULE of every
+    row, which is empty for the names of ChEBI itself, and the columns of
+    the key of the rows, see ROW_KEY_DTYPE. The origins are the rows of
+    the names in the ChEBI files, by default the positions of the names, so
+    the rows of a part of the compounds can be put among the rows of the
+    others. Every compound is filtered and expanded on the basis of its own
+    names only.
+    '''
+
+    name_rules = NameRules(IRRELEVANT_WORDS, CLASS_PREFIXES, RNA_SUFFIXES)
+
+    keys = numpy.zeros(len(names), dtype = ROW_KEY_DTYPE)
+    keys['ORIGIN'] = numpy.arange(len(names)) if origins is None else origins
+
+    # Remove double and trailing white spaces
+    names = [TRAILING_SPACE.sub('', MULTIPLE_SPACES.sub(' ', name)) for name in names]
+
+    # Drop the classes of compounds on the basis of their IDs and names, and
+    # the generic names
+    keep = run_filter_plan(names, ids, [('drop ids', IRRELEVANT_NAMES),
+                                        ('drop names', name_rules.is_class_name),
+                                        ('drop ids', set(GENERIC_NAMES_BY_ID)),
+                                        ('drop names', set(GENERIC_NAMES))])
+    names, ids, keys = apply_mask(keep, names, ids, keys)
+
+    # Some entries start with 'a ' or 'an ' followed by a chemical, we will remove
+    # the 'a ' or 'an ' from the entries
+    names = [ARTICLE.sub(r"\1", name) for name in names]
+
+    names, ids, rules, keys = expand_names(names, ids, [''] * len(names), keys, 'dashes')
+    names, ids, rules, keys = expand_names(names, ids, rules, keys, 'elements')
+    names, ids, rules, keys = expand_names(names, ids, rules, keys, 'versions')
+
+    # Drop the words that are not hazards, the entries of length smaller than 
+    # 4 and the entries that are only digits
+    keep = run_filter_plan(names, ids, [('drop names', set(NOT_HAZARD_WORDS)),
+                                        ('drop names', is_short),
+                                        ('drop names', str.isdigit)])
+    names, ids, rules, keys = apply_mask(keep, names, ids, rules, keys)
+
+    names, ids, rules, keys = expand_names(names, ids, rules, keys, 'plurals')
+
+    # Remove empty string and drop the chemical names that end with 'rna' on 
+    # the basis of their IDs - because they are RNAs
+    keep = run_filter_plan(names, ids, [('drop names', {''}),
+                                        ('drop ids', name_rules.has_suffix)])
+    names, ids, rules, keys = apply_mask(keep, names, ids, rules, keys)
+
+    rows = pandas.DataFrame({'NAME': pandas.Series(names, dtype = object),
+                             'COMPOUND_ID': ids,
+                             'RULE': pandas.Series(rules, dtype = object)})
+    for column in ROW_KEY_COLUMNS:
+        rows[column] = keys[column]
+
+    return rows
+
+def select_hazards(rows):
+
+    '''
+    Makes the list of possible hazards from the rows of expand_chebi_names,
+    of all compounds. Gives a dataframe with the NAME, COMPOUND_ID and RULE
+    of every hazard, without duplicated names, from the longest name to the
+    shortest one.
+    '''
+
+    # Put the rows in the order of the stages, which they already are in
+    # when all compounds were expanded at once
+    order = numpy.lexsort([rows[column].to_numpy() for column in reversed(ROW_KEY_COLUMNS)])
+
+    # Drop rows with duplicate combination of name and id and remove double 
+    # entries of names with different ids, keep the first occurence, which
+    # together keep the first row of every name
+    name_codes, _ = pandas.factorize(rows['NAME'].to_numpy(dtype = object)[order])
+    _, first_rows = numpy.unique(name_codes, return_index = True)
+
+    # Transform back to dataframe
+    processed_chebi = rows.iloc[order[first_rows]][['NAME', 'COMPOUND_ID', 'RULE']]
+    processed_chebi = processed_chebi.reset_index(drop = True)
+
+    # Sort the list from longest string to smallest
+    return processed_chebi.sort_values(by = 'NAME', key = lambda x: x.str.len(), 
+                                       ascending = False)
+
+def preprocess_chebi_names(names, ids):
+
+    '''
+    Makes the list of possible hazards from the lowercased ChEBI names and
+    their identifiers. Gives a dataframe with the NAME and COMPOUND_ID of
+    every hazard, without duplicated names, from the longest name to the
+    shortest one, and the expansion RULE that produced the name, which is
+    empty for the names of ChEBI itself.
+    '''
+
+    return select_hazards(expand_chebi_names(names, ids))
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:12:56 2026
+
+This script contains the functions to update the list of possible hazards to
+a new ChEBI release without preprocessing all compounds again. A snapshot of
+the previous release is kept next to the list: the names of the flat files
+with their compound and file, the rows that chebi_funcs.py made of them
+before the duplicated names were dropped and the list of hazards, which the
+new list is compared with for the changelog. A compound of the new release is
+only filtered and expanded again when its names differ from those in the
+snapshot, as the filter plans and expansions of a compound only depend on
+its own names. The rows of the other compounds are taken from the snapshot,
+with their row in the new files, and the key of the rows puts all of them
+in the order they would have had in a full run, so the list of hazards is
+the same as the one of Preprocess_chebi.py without --incremental.
+"""
+
+import os
+import numpy
+import pandas
+import pyarrow as pa
+import pyarrow.parquet as pq
+from chebi_funcs import CHUNK_SIZE, read_chebi_names, expand_chebi_names
+
+SNAPSHOT_RELEASE_FILE = 'chebi_release.parquet'
+SNAPSHOT_ROWS_FILE = 'hazard_rows.parquet'
+SNAPSHOT_HAZARDS_FILE = 'hazards.parquet'
+SNAPSHOT_FILES = [SNAPSHOT_RELEASE_FILE, SNAPSHOT_ROWS_FILE, SNAPSHOT_HAZARDS_FILE]
+
+def load_chebi_release(compounds_path, names_path, chunk_size = CHUNK_SIZE):
+
+    '''
+    Gives a dataframe with the lowercased NAME and the COMPOUND_ID of the
+    compounds of the ChEBI compounds file followed by those of the synonyms
+    of the names file, in the order of load_chebi_names, and the FILE of
+    every name, 0 for the compounds file and 1 for the names file
+    '''
+
+    compound_names, compound_ids = read_chebi_names(compounds_path, 'CHEBI_ACCESSION', chunk_size)
+    synonyms, synonym_ids = read_chebi_names(names_path, 'COMPOUND_ID', chunk_size)
+
+    return pandas.DataFrame({'NAME': pandas.Series(compound_names + synonyms, dtype = object),
+                             'COMPOUND_ID': numpy.concatenate(compound_ids + synonym_ids),
+                             'FILE': numpy.repeat(numpy.array([0, 1], dtype = 'int8'),
+                                                  [len(compound_names), len(synonyms)])})
+
+def write_table_file(frame, path):
+
+    # Written next to the file first, so an interrupted update leaves the
+    # previous snapshot intact
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index = False), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def write_chebi_snapshot(release, rows, hazards, snapshot_dir):
+
+    '''
+    Writes the names of a release, the rows that expand_chebi_names made of
+    them and the hazards that select_hazards selected of these to the
+    snapshot folder
+    '''
+
+    os.makedirs(snapshot_dir, exist_ok = True)
+    for frame, snapshot_file in zip([release, rows, hazards], SNAPSHOT_FILES):
+        write_table_file(frame, os.path.join(snapshot_dir, snapshot_file))
+
+def has_chebi_snapshot(snapshot_dir):
+
+    return all(os.path.exists(os.path.join(snapshot_dir, snapshot_file))
+               for snapshot_file in SNAPSHOT_FILES)
+
+def load_chebi_snapshot(snapshot_dir):
+
+    '''
+    Reads the names of the release, the rows and the hazards of the snapshot
+    folder, with the names as Python strings, as load_chebi_release and
+    expand_chebi_names give them
+    '''
+
+    release, rows, hazards = [pq.read_table(os.path.join(snapshot_dir, snapshot_file)).to_pandas()
+                              for snapshot_file in SNAPSHOT_FILES]
+
+    release['NAME'] = release['NAME'].astype(object)
+    rows['NAME'] = rows['NAME'].astype(object)
+    rows['RULE'] = rows['RULE'].astype(object)
+
+    return release, rows, hazards
+
+def align_compounds(previous_release, release, compound_ids):
+
+    '''
+    Gives the rows of the compounds in the previous and in the new release,
+    grouped by compound and in the order of the files within a compound, so
+    the rows of a compound with as many names in both releases are aligned
+    '''
+
+    previous_ids = previous_release['COMPOUND_ID'].to_numpy()
+    ids = release['COMPOUND_ID'].to_numpy()
+    previous_rows = numpy.flatnonzero(numpy.isin(previous_ids, compound_ids))
+    rows = numpy.flatnonzero(numpy.isin(ids, compound_ids))
+
+    return (previous_rows[numpy.argsort(previous_ids[previous_rows], kind = 'stable')],
+            rows[numpy.argsort(ids[rows], kind = 'stable')])
+
+def diff_releases(previous_release, release):
+
+    '''
+    Gives the arrays of the compounds that were added to, changed in, removed
+    from and left unchanged in the new release. A compound has changed when
+    its names, their files or their order are not the same.
+    '''
+
+    previous_compounds, previous_counts = numpy.unique(previous_release['COMPOUND_ID'].to_numpy(),
+                                                       return_counts = True)
+    compounds, counts = numpy.unique(release['COMPOUND_ID'].to_numpy(), return_counts = True)
+    common, previous_index, index = numpy.intersect1d(previous_compounds, compounds,
+                                                      return_indices = True)
+    same_counts = previous_counts[previous_index] == counts[index]
+
+    # The names of the compounds with as many names in both releases are
+    # compared row by row
+    previous_rows, rows = align_compounds(previous_release, release, common[same_counts])
+    differs = ((previous_release['NAME'].to_numpy(dtype = object)[previous_rows] !=
+                release['NAME'].to_numpy(dtype = object)[rows]) |
+               (previous_release['FILE'].to_numpy()[previous_rows] !=
+                release['FILE'].to_numpy()[rows]))
+    changed_names = numpy.unique(release['COMPOUND_ID'].to_numpy()[rows[differs]])
+
+    return {'added': numpy.setdiff1d(compounds, previous_compounds),
+            'changed': numpy.union1d(common[~same_counts], changed_names),
+            'removed': numpy.setdiff1d(previous_compounds, compounds),
+            'unchanged': numpy.setdiff1d(common[same_counts], changed_names)}
+
+def map_origins(previous_release, release, compound_ids):
+
+    '''
+    Gives the row in the new release of every row of the previous release of
+    the compounds, whose names are the same in both releases, and -1 for the
+    rows of the other compounds
+    '''
+
+    previous_rows, rows = align_compounds(previous_release, release, compound_ids)
+
+    origins = numpy.full(len(previous_release), -1, dtype = 'int32')
+    origins[previous_rows] = rows
+
+    return origins
+
+def update_chebi_rows(previous_release, previous_rows, release):
+
+    '''
+    Gives the rows of expand_chebi_names of the new release, of which only
+    the rows of the added and changed compounds are made again, and the
+    compounds of diff_releases
+    '''
+
+    diff = diff_releases(previous_release, release)
+
+    unchanged_rows = previous_rows[previous_rows['COMPOUND_ID'].isin(diff['unchanged'])].copy()
+    unchanged_rows['ORIGIN'] = map_origins(previous_release, release,
+                                           diff['unchanged'])[unchanged_rows['ORIGIN'].to_numpy()]
+
+    origins = numpy.flatnonzero(release['COMPOUND_ID'].isin(
+        numpy.concatenate([diff['added'], diff['changed']])))
+    updated_rows = expand_chebi_names(release['NAME'].to_numpy(dtype = object)[origins].tolist(),
+                                      release['COMPOUND_ID'].to_numpy()[origins],
+                                      origins = origins)
+
+    rows = pandas.concat([unchanged_rows, updated_rows], ignore_index = True)
+
+    return rows, diff
+
+def hazard_changelog(previous_hazards, hazards):
+
+    '''
+    Gives the names that were removed from and added to the list of hazards,
+    with their compound, in a dataframe with the NAME, COMPOUND_ID and the
+    CHANGE. A name that moved to another compound is removed with the old
+    compound and added with the new one.
+    '''
+
+    changes = previous_hazards[['NAME', 'COMPOUND_ID']].merge(hazards[['NAME', 'COMPOUND_ID']],
+                                                               how = 'outer',
+                                                               indicator = 'CHANGE')
+    changes = changes[changes['CHANGE'] != 'both']
+    changes['CHANGE'] = changes['CHANGE'].map({'left_only': 'removed',
+                                               'right_only': 'added'}).astype(str)
+
+    return changes.sort_values(by = ['NAME', 'CHANGE'], ascending = [True, False])
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 23:14:26 2026
+
+This script contains the streaming mode of Clean_abstracts.py, for a corpus
+that is too large to be cleaned in memory on a single core. The corpus store
+is read one page at a time and the articles go through the same filters as
+in Clean_abstracts.py: abstracts that are missing, duplicated or have a DOI
+that was seen before are dropped in the main process, which keeps a digest
+of every abstract and the DOIs it has seen, after which the articles are
+sent in chunks to a pool of processes that drop the short abstracts and the
+notices, see notice_filter_funcs.py, and clean the others for the word embeddings and for the LLM.
+The cleaned chunks are written as they come back, in doc_id order, and only
+a few chunks are in memory at any time.
+
+With a near duplicate threshold, the processes also make the MinHash
+signatures of the cleaned abstracts and the main process drops the near
+duplicates with the index of near_duplicate_funcs.py before a chunk is
+written.
+"""
+
+import hashlib
+import multiprocessing
+from collections import deque
+import pandas
+import pyarrow.parquet as pq
+from corpus_store_funcs import (iter_corpus_pages, clean_abstracts_table,
+                                CLEAN_ABSTRACTS_SCHEMA)
+from text_cleaning_funcs import clean_text, clean_text_for_llm
+from near_duplicate_funcs import (MinHasher, NearDuplicateIndex,
+                                  near_duplicate_report)
+from notice_filter_funcs import NoticeFilter, NOTICE_RULES
+
+# Abstracts up to this length are dropped
+MIN_ABSTRACT_LENGTH = 60
+
+class DuplicateFilter:
+
+    '''
+    Tells if an article is the first one with its abstract and, if it has
+    one, its DOI, in the order in which the articles are given. The abstracts
+    are kept as digests, so the memory use is small also for a large corpus.
+    '''
+
+    def __init__(self):
+
+        self.abstract_digests = set()
+        self.dois = set()
+
+    def is_new(self, doi, abstract):
+
+        digest = hashlib.blake2b(abstract.encode('utf-8'), digest_size = 16).digest()
+        if digest in self.abstract_digests:
+            return False
+        self.abstract_digests.add(digest)
+
+        if pandas.isna(doi):
+            return True
+        if doi in self.dois:
+            return False
+        self.dois.add(doi)
+
+        return True
+
+def iter_new_articles(corpus_dir, chunk_size):
+
+    '''
+    Reads the corpus store page by page and yields the articles with an
+    abstract that were not seen before, in dataframes of chunk_size rows
+    '''
+
+    duplicate_filter = DuplicateFilter()
+    chunk = []
+    rows = 0
+
+    for page in iter_corpus_pages(corpus_dir,
+                                  columns = ['query', 'doi', 'title', 'abstract',
+                                             'year', 'row_id']):
+        page = page.rename(columns = {'row_id': 'doc_id'})
+        page = page[page['abstract'].notna()]
+        is_new = [duplicate_filter.is_new(doi, abstract)
+                  for doi, abstract in zip(page['doi'], page['abstract'])]
+        chunk.append(page[is_new])
+        rows += int(sum(is_new))
+
+        while rows >= chunk_size:
+            articles = pandas.concat(chunk, ignore_index = True)
+            yield articles.iloc[:chunk_size]
+            chunk = [articles.iloc[chunk_size:]]
+            rows -= chunk_size
+
+    if rows:
+        yield pandas.concat(chunk, ignore_index = True)
+
+def notice_report(notices):
+
+    return pandas.DataFrame(notices, columns = ['doc_id', 'rule', 'pattern'])
+
+# The notice filter of a worker process, set by init_worker
+worker_notice_filter = None
+
+def init_worker(notice_rules):
+
+    global worker_notice_filter
+    worker_notice_filter = NoticeFilter(notice_rules)
+
+def clean_chunk(articles, signatures = False):
+
+    '''
+    Drops the short abstracts and the notices of a chunk and adds the cleaned
+    abstracts for the word embeddings and for the LLM. Gives the cleaned
+    chunk, the MinHash signatures of the cleaned abstracts if asked for, and
+    the doc_id, rule and pattern of the dropped notices.
+    '''
+
+    articles = articles[articles['abstract'].str.len() > MIN_ABSTRACT_LENGTH]
+
+    keep = []
+    notices = []
+    for doc_id, abstract in zip(articles['doc_id'], articles['abstract']):
+        notice = worker_notice_filter.match(abstract)
+        keep.append(notice is None)
+        if notice is not None:
+            notices.append((doc_id, *notice))
+    articles = articles[keep].copy()
+
+    articles['clean_abstract'] = articles['abstract'].map(clean_text)
+    articles['clean_abstract_llm'] = articles['abstract'].map(clean_text_for_llm)
+
+    if not signatures:
+        return articles, None, notices
+
+    hasher = MinHasher()
+
+    return (articles, [hasher.signature(text) for text in articles['clean_abstract']],
+            notices)
+
+def clean_corpus_streaming(corpus_dir, path, processes = None, chunk_size = 10000,
+                           near_duplicate_threshold = None,
+                           notice_rules = NOTICE_RULES):
+
+    '''
+    Cleans the corpus store chunk by chunk with a pool of processes and
+    writes the cleaned abstracts to path in doc_id order, with the schema of
+    write_clean_abstracts. At most two chunks per process are waiting to be
+    cleaned or written. With a near_duplicate_threshold the near duplicates
+    are dropped as well. Returns the number of written abstracts, the report
+    of the dropped notices and the cluster report of the near duplicates.
+    '''
+
+    processes = processes or multiprocessing.cpu_count()
+    signatures = near_duplicate_threshold is not None
+    if signatures:
+        index = NearDuplicateIndex(near_duplicate_threshold)
+    report = []
+    notices = []
+    rows_written = 0
+
+    with multiprocessing.Pool(processes, initializer = init_worker,
+                              initargs = (notice_rules,)) as pool, \
+            pq.ParquetWriter(path, CLEAN_ABSTRACTS_SCHEMA) as writer:
+
+        pending = deque()
+
+        def write_next():
+
+            articles, chunk_signatures, chunk_notices = pending.popleft().get()
+            notices.extend(chunk_notices)
+
+            if signatures:
+                keep = []
+                for doc_id, signature in zip(articles['doc_id'], chunk_signatures):
+                    duplicate_of, similarity = index.add(doc_id, signature)
+                    keep.append(duplicate_of is None)
+                    if duplicate_of is not None:
+                        report.append((doc_id, duplicate_of, similarity))
+                articles = articles[keep]
+
+            writer.write_table(clean_abstracts_table(articles))
+
+            return len(articles)
+
+        for articles in iter_new_articles(corpus_dir, chunk_size):
+            pending.append(pool.apply_async(clean_chunk, (articles, signatures)))
+            if len(pending) >= 2 * processes:
+                rows_written += write_next()
+
+        while pending:
+            rows_written += write_next()
+
+    return rows_written, notice_report(notices), near_duplicate_report(report)
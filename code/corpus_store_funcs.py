@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:12:30 2026
+
+This script contains functions to write the harvested articles to a columnar
+corpus store and to read them back. The store is a Parquet dataset with a
+typed schema, so the corpus does not have to be parsed again as csv text,
+which lost rows with quotes or newlines in the abstract. Every committed page
+of the harvest is written as a single file, named after the page number, so
+the pages that were written after the last commit of an interrupted harvest
+can be removed again. The query id and the publication year are columns of
+the files rather than folders, which would split a page in a file per query
+and year. The store is partitioned by query and year with a partition index
+instead, which lists for every query id and year the pages that hold its
+rows, so loading a query or a year only reads those pages. The pages of the
+harvest come from the date slices of a single query, so these are only a few.
+The index is written once a harvest is complete, and a page it does not list
+is always read. The row_id column keeps the order in which the
+rows were written, which is the order of the csv file we used before.
+
+Next to the pages, the store keeps a dictionary of the queries, so a row only
+carries the id of the query it is attributed to, and the provenance of every
+article: a bitmap with a bit for every query that found the article, not only
+the first one. Files starting with an underscore are not part of the dataset.
+"""
+
+import os
+import re
+import numpy
+import pandas
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+CORPUS_SCHEMA = pa.schema([('row_id', pa.int64()),
+                           ('doi', pa.string()),
+                           ('title', pa.string()),
+                           ('abstract', pa.string()),
+                           ('keywords', pa.list_(pa.string())),
+                           ('query_id', pa.int16()),
+                           ('year', pa.int16())])
+
+PAGE_FILE_TEMPLATE = 'page-{:08d}.parquet'
+PAGE_FILE_PATTERN = re.compile(r'page-(\d+)\.parquet$')
+
+QUERY_DICTIONARY_FILE = '_queries.csv'
+QUERY_HITS_FILE = '_query_hits.bin'
+PROVENANCE_FILE = '_provenance.parquet'
+PARTITION_INDEX_FILE = '_partitions.parquet'
+
+PARTITION_INDEX_SCHEMA = pa.schema([('query_id', pa.int16()),
+                                    ('year', pa.int16()),
+                                    ('page', pa.int64())])
+
+# Every hit of a query is logged as the row id of the article and the query id
+HIT_DTYPE = numpy.dtype([('row_id', '<i8'), ('query_id', '<i2')])
+
+# The cleaned abstracts, with the variant for the word embeddings and the one
+# for the LLM next to each other
+CLEAN_ABSTRACTS_SCHEMA = pa.schema([('doc_id', pa.int64()),
+                                    ('query', pa.dictionary(pa.int16(), pa.string())),
+                                    ('doi', pa.string()),
+                                    ('title', pa.string()),
+                                    ('abstract', pa.string()),
+                                    ('year', pa.int16()),
+                                    ('clean_abstract', pa.string()),
+                                    ('clean_abstract_llm', pa.string())])
+
+CLEAN_ABSTRACT_VARIANTS = {'embedding': 'clean_abstract',
+                           'llm': 'clean_abstract_llm'}
+
+def parse_year(pub_year):
+
+    '''
+    The pubYear of EuropePMC is a string, which is missing for a few articles
+    '''
+
+    try:
+        return int(pub_year)
+    except (TypeError, ValueError):
+        return None
+
+def page_table(page_data, first_row_id, query_ids):
+
+    '''
+    Changes the rows of a page (Query, DOI, Title, Abstract, PubYear, the
+    queries that found the article, Keywords) into a table of the corpus
+    schema, where the query is replaced by its id. Empty
+    fields become nulls, like they became NaN when the csv file was read.
+    '''
+
+    return pa.Table.from_pydict({
+        'row_id': list(range(first_row_id, first_row_id + len(page_data))),
+        'doi': [row[1] or None for row in page_data],
+        'title': [row[2] or None for row in page_data],
+        'abstract': [row[3] or None for row in page_data],
+        'keywords': [row[6] for row in page_data],
+        'query_id': [query_ids[row[0]] for row in page_data],
+        'year': [parse_year(row[4]) for row in page_data]},
+        schema = CORPUS_SCHEMA)
+
+def write_page(page_data, corpus_dir, page_number, first_row_id, query_ids):
+
+    '''
+    Writes the rows of a page to a file of the corpus store and makes sure
+    the file is on disk before the journal is updated
+    '''
+
+    if not page_data:
+        return
+
+    os.makedirs(corpus_dir, exist_ok = True)
+    path = os.path.join(corpus_dir, PAGE_FILE_TEMPLATE.format(page_number))
+    pq.write_table(page_table(page_data, first_row_id, query_ids), path)
+
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+def update_page_rows(corpus_dir, page_number, updated_rows):
+
+    '''
+    Overwrites the DOI, title, abstract, keywords and year of rows of a page
+    with the rows of the articles in updated_rows, a dictionary from row id
+    to row. The row id and the query the article is attributed to stay the
+    same. The page is written next to the old file and moved over it, so it
+    is never partial.
+    '''
+
+    path = os.path.join(corpus_dir, PAGE_FILE_TEMPLATE.format(page_number))
+    articles = pq.read_table(path).to_pylist()
+
+    for article in articles:
+        row = updated_rows.get(article['row_id'])
+        if row is not None:
+            article.update({'doi': row[1] or None, 'title': row[2] or None,
+                            'abstract': row[3] or None, 'keywords': row[6],
+                            'year': parse_year(row[4])})
+
+    pq.write_table(pa.Table.from_pylist(articles, schema = CORPUS_SCHEMA),
+                   path + '.tmp')
+    with open(path + '.tmp', 'rb') as f:
+        os.fsync(f.fileno())
+
+    os.replace(path + '.tmp', path)
+
+def page_first_row_ids(corpus_dir):
+
+    '''
+    Gives the page numbers of the corpus store and the first row id of every
+    page, from the statistics of the files
+    '''
+
+    pages = page_files(corpus_dir)
+    page_numbers = sorted(pages)
+
+    return page_numbers, [pq.read_metadata(pages[page_number]).row_group(0).column(0).statistics.min
+                          for page_number in page_numbers]
+
+def page_files(corpus_dir):
+
+    '''
+    Gives the file of the corpus store per page number
+    '''
+
+    pages = {}
+    if os.path.isdir(corpus_dir):
+        for filename in os.listdir(corpus_dir):
+            match = PAGE_FILE_PATTERN.match(filename)
+            if match:
+                pages[int(match.group(1))] = os.path.join(corpus_dir, filename)
+
+    return pages
+
+def remove_uncommitted_pages(corpus_dir, pages):
+
+    '''
+    Removes the files of the pages from page number pages onwards, which were
+    not committed to the journal when the previous run died. With pages = 0
+    the store is emptied for a fresh harvest.
+    '''
+
+    for page_number, path in page_files(corpus_dir).items():
+        if page_number >= pages:
+            os.remove(path)
+
+def write_partition_index(corpus_dir):
+
+    '''
+    Writes the partition index of the store, with a row for every query id,
+    year and page that holds rows of that query and year
+    '''
+
+    pages = page_files(corpus_dir)
+    partitions = []
+
+    for page_number in sorted(pages):
+        page_partitions = pq.read_table(pages[page_number],
+                                        columns = ['query_id', 'year']).group_by(
+                                            ['query_id', 'year']).aggregate([])
+        partitions.append(page_partitions.append_column(
+            'page', pa.array(numpy.full(len(page_partitions), page_number), pa.int64())))
+
+    table = (pa.concat_tables(partitions).cast(PARTITION_INDEX_SCHEMA) if partitions
+             else PARTITION_INDEX_SCHEMA.empty_table())
+
+    path = os.path.join(corpus_dir, PARTITION_INDEX_FILE)
+    pq.write_table(table, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def remove_partition_index(corpus_dir):
+
+    '''
+    Removes the partition index before the pages are changed, so a harvest
+    that dies does not leave an index that misses rows
+    '''
+
+    path = os.path.join(corpus_dir, PARTITION_INDEX_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+def partition_page_files(corpus_dir, query_ids = None, years = None):
+
+    '''
+    Gives the files of the pages that hold rows of the query ids and years,
+    in the order of the page numbers. Without a partition index, and for the
+    pages that the index does not list, all files are given.
+    '''
+
+    pages = page_files(corpus_dir)
+    path = os.path.join(corpus_dir, PARTITION_INDEX_FILE)
+
+    if (query_ids is None and years is None) or not os.path.exists(path):
+        return [pages[page_number] for page_number in sorted(pages)]
+
+    partitions = pq.read_table(path).to_pandas()
+    match = numpy.ones(len(partitions), dtype = bool)
+    if query_ids is not None:
+        match &= partitions['query_id'].isin(query_ids).to_numpy()
+    if years is not None:
+        match &= partitions['year'].isin(years).to_numpy()
+
+    page_numbers = (set(partitions.loc[match, 'page']) |
+                    (set(pages) - set(partitions['page'])))
+
+    return [pages[page_number] for page_number in sorted(page_numbers)
+            if page_number in pages]
+
+def write_query_dictionary(query_dictionary, corpus_dir):
+
+    '''
+    Writes the queries in the order of their ids
+    '''
+
+    os.makedirs(corpus_dir, exist_ok = True)
+
+    pandas.DataFrame({'query_id': numpy.arange(len(query_dictionary)),
+                      'query': query_dictionary}).to_csv(
+        os.path.join(corpus_dir, QUERY_DICTIONARY_FILE), index = False)
+
+def load_query_dictionary(corpus_dir):
+
+    return pandas.read_csv(os.path.join(corpus_dir, QUERY_DICTIONARY_FILE))['query'].tolist()
+
+def append_query_hits(hits, corpus_dir):
+
+    '''
+    Appends the (row id, query id) hits of a page to the hit log and returns
+    its new size
+    '''
+
+    with open(os.path.join(corpus_dir, QUERY_HITS_FILE), 'ab') as f:
+        f.write(numpy.array(hits, dtype = HIT_DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+def query_bits_width(n_queries):
+
+    '''
+    Number of bytes of a bitmap with a bit for each of the queries
+    '''
+
+    return max(1, (n_queries + 7) // 8)
+
+def write_provenance(corpus_dir, n_rows, n_queries, hits_bytes):
+
+    '''
+    Folds the committed part of the hit log into one bitmap per article, in
+    which bit i (bit i % 8 of byte i // 8) is set when query i found the
+    article, and writes the bitmaps with their row ids
+    '''
+
+    with open(os.path.join(corpus_dir, QUERY_HITS_FILE), 'rb') as f:
+        hits = numpy.frombuffer(f.read(hits_bytes), dtype = HIT_DTYPE)
+
+    width = query_bits_width(n_queries)
+    bits = numpy.zeros((n_rows, width), dtype = numpy.uint8)
+    numpy.bitwise_or.at(bits, (hits['row_id'], hits['query_id'] // 8),
+                        (1 << (hits['query_id'] % 8)).astype(numpy.uint8))
+
+    table = pa.table({'row_id': pa.array(numpy.arange(n_rows), pa.int64()),
+                      'query_bits': pa.FixedSizeBinaryArray.from_buffers(
+                          pa.binary(width), n_rows,
+                          [None, pa.py_buffer(bits.tobytes())])})
+
+    pq.write_table(table, os.path.join(corpus_dir, PROVENANCE_FILE))
+
+def load_provenance(corpus_dir):
+
+    '''
+    Reads the provenance bitmaps as a matrix with a row per article (in row
+    id order) and a boolean column per query id
+    '''
+
+    table = pq.read_table(os.path.join(corpus_dir, PROVENANCE_FILE))
+    query_bits = table.column('query_bits').combine_chunks()
+    width = query_bits.type.byte_width
+
+    bits = numpy.frombuffer(query_bits.buffers()[1], dtype = numpy.uint8,
+                            count = len(query_bits) * width,
+                            offset = query_bits.offset * width)
+
+    return numpy.unpackbits(bits.reshape(-1, width), axis = 1,
+                            bitorder = 'little').astype(bool)
+
+def query_yield(corpus_dir):
+
+    '''
+    Counts per query the articles it found (hits), the articles that are
+    attributed to it because it was the first query that found them, and
+    the articles that no other query found (unique)
+    '''
+
+    query_dictionary = load_query_dictionary(corpus_dir)
+    matrix = load_provenance(corpus_dir)[:, :len(query_dictionary)]
+    attributed = load_corpus(corpus_dir, columns = ['query_id'])['query_id']
+
+    return pandas.DataFrame({
+        'query_id': numpy.arange(len(query_dictionary)),
+        'query': query_dictionary,
+        'hits': matrix.sum(axis = 0),
+        'attributed': numpy.bincount(attributed, minlength = len(query_dictionary)),
+        'unique': matrix[matrix.sum(axis = 1) == 1].sum(axis = 0)})
+
+def combine_filters(partition_filter, expression):
+
+    return expression if partition_filter is None else partition_filter & expression
+
+def iter_corpus_pages(corpus_dir, columns = None):
+
+    '''
+    Reads the corpus store one page at a time, as pandas dataframes with the
+    columns of load_corpus. The pages come in the order of their numbers and
+    the rows of a page in the order of their row ids, so the rows are read in
+    the order in which they were harvested, but only a page is in memory.
+    '''
+
+    if columns is None:
+        columns = ['row_id', 'query'] + CORPUS_SCHEMA.names[1:]
+
+    read_columns = ['row_id'] + [column for column in columns
+                                 if column not in ['row_id', 'query']]
+    if 'query' in columns and 'query_id' not in read_columns:
+        read_columns.append('query_id')
+
+    if 'query' in columns:
+        query_dictionary = load_query_dictionary(corpus_dir)
+
+    pages = page_files(corpus_dir)
+
+    for page_number in sorted(pages):
+        articles = pq.read_table(pages[page_number], columns = read_columns).to_pandas()
+
+        if 'query' in columns:
+            articles['query'] = pandas.Categorical.from_codes(
+                articles['query_id'], query_dictionary)
+
+        yield articles[columns]
+
+def load_corpus(corpus_dir, columns = None, query_ids = None, years = None,
+                partition_filter = None):
+
+    '''
+    Reads the corpus store into a pandas dataframe with the rows in the order
+    in which they were harvested. Only the given columns are read, and only
+    the rows of the query ids and years, of which the partition index gives
+    the pages to read, and that match a partition_filter expression, e.g.
+    ds.field('year') >= 2020, of which the statistics of the row groups skip
+    the files without a match. The ids of the queries are their positions in
+    load_query_dictionary. The query column is looked up in the query
+    dictionary and comes as a categorical column.
+    '''
+
+    if columns is None:
+        columns = ['row_id', 'query'] + CORPUS_SCHEMA.names[1:]
+
+    dataset = ds.dataset(partition_page_files(corpus_dir, query_ids, years),
+                         schema = CORPUS_SCHEMA, format = 'parquet')
+
+    if query_ids is not None:
+        partition_filter = combine_filters(partition_filter,
+                                           ds.field('query_id').isin(list(query_ids)))
+    if years is not None:
+        partition_filter = combine_filters(partition_filter,
+                                           ds.field('year').isin(list(years)))
+
+    read_columns = ['row_id'] + [column for column in columns
+                                 if column not in ['row_id', 'query']]
+    if 'query' in columns and 'query_id' not in read_columns:
+        read_columns.append('query_id')
+
+    table = dataset.to_table(columns = read_columns, filter = partition_filter)
+    articles = table.sort_by('row_id').to_pandas()
+
+    if 'query' in columns:
+        articles['query'] = pandas.Categorical.from_codes(
+            articles['query_id'], load_query_dictionary(corpus_dir))
+
+    return articles[columns]
+
+def clean_abstracts_table(articles):
+
+    return pa.Table.from_pandas(articles[CLEAN_ABSTRACTS_SCHEMA.names],
+                                schema = CLEAN_ABSTRACTS_SCHEMA,
+                                preserve_index = False)
+
+def write_clean_abstracts(articles, path):
+
+    '''
+    Writes the dataframe of cleaned abstracts to a single Parquet file with
+    the typed schema of the cleaned abstracts, in the order of its rows
+    '''
+
+    pq.write_table(clean_abstracts_table(articles), path)
+
+def load_clean_abstracts(path, variant = 'embedding', columns = None):
+
+    '''
+    Reads the cleaned abstracts with the cleaned variant of the abstract, for
+    the word embeddings or for the LLM, in the clean_abstract column, as in
+    the csv files that were written for each of them before
+    '''
+
+    if columns is None:
+        columns = CLEAN_ABSTRACTS_SCHEMA.names[:6] + ['clean_abstract']
+
+    clean_column = CLEAN_ABSTRACT_VARIANTS[variant]
+    read_columns = [clean_column if column == 'clean_abstract' else column
+                    for column in columns]
+
+    articles = pq.read_table(path, columns = read_columns).to_pandas()
+
+    return articles.rename(columns = {clean_column: 'clean_abstract'})
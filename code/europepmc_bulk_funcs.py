@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:05:44 2026
+
+This script contains functions to build the corpus from the gzipped XML dumps
+of the EuropePMC open access subset instead of from the REST search
+webservice. Every dump file holds many full text articles in JATS XML, which
+are read one article at a time, so a dump is never held in memory as a whole.
+The title, abstract and keywords of an article are put in the same form as
+in the REST results, the queries are evaluated locally with query_funcs.py,
+and the matching articles are written to the same corpus store as the
+harvest, with the same provenance of the queries that found them. The dump
+files are parsed in parallel, one file per process.
+"""
+
+import os
+import gzip
+import multiprocessing
+import xml.etree.ElementTree as ET
+from query_funcs import parse_query, matching_queries
+from europepmc_funcs import published_before_cutoff, PUBLICATION_CUTOFF
+from corpus_store_funcs import (write_page, remove_uncommitted_pages,
+                                write_query_dictionary, append_query_hits,
+                                write_provenance, write_partition_index,
+                                remove_partition_index, QUERY_HITS_FILE)
+
+# The inline markup that the REST webservice keeps in the abstractText
+INLINE_TAGS = {'italic': 'i', 'bold': 'b', 'sup': 'sup', 'sub': 'sub'}
+
+# Dates that tell when the article was published, the first ones are used
+# for the publication year as the REST webservice does with the journal issue
+PUB_DATE_TYPES = ['ppub', 'collection', 'epub', 'pub']
+
+def local_name(tag):
+
+    '''
+    Drops the namespace from the tag of an element
+    '''
+
+    return tag.rsplit('}', 1)[-1]
+
+def element_html(element):
+
+    '''
+    Gives the text of an element with the inline markup as html tags and the
+    section titles as <h4> headers, like the abstractText of the REST results
+    '''
+
+    tag = local_name(element.tag)
+    parts = [element.text or '']
+
+    for child in element:
+        parts.append(element_html(child))
+        parts.append(child.tail or '')
+
+    text = ''.join(parts)
+
+    if tag in INLINE_TAGS:
+        return '<{0}>{1}</{0}>'.format(INLINE_TAGS[tag], text)
+
+    if tag == 'title':
+        return '<h4>{}</h4>'.format(text.strip())
+
+    if tag in ['p', 'sec', 'abstract']:
+        return ' '.join(text.split()) + ' '
+
+    return text
+
+def find_first(element, tag):
+
+    for child in element.iter():
+        if local_name(child.tag) == tag:
+            return child
+
+    return None
+
+def pub_date(element):
+
+    '''
+    Gives the date of a pub-date element as yyyy-mm-dd, where a missing day
+    or month is taken as the first one
+    '''
+
+    parts = {local_name(child.tag): (child.text or '').strip()
+             for child in element}
+
+    if not parts.get('year', '').isdigit():
+        return None
+
+    month = parts.get('month', '1')
+    day = parts.get('day', '1')
+
+    return '{}-{:02d}-{:02d}'.format(int(parts['year']),
+                                     int(month) if month.isdigit() else 1,
+                                     int(day) if day.isdigit() else 1)
+
+def article_record(article):
+
+    '''
+    Changes a JATS article element into a dictionary with the fields of a
+    core record of the REST webservice: id, doi, title, abstractText,
+    keywordList, pubYear and firstPublicationDate
+    '''
+
+    meta = find_first(article, 'article-meta')
+    if meta is None:
+        return None
+
+    record = {'id': '', 'doi': '', 'title': '', 'abstractText': '',
+              'keywordList': {'keyword': []}, 'pubYear': '',
+              'firstPublicationDate': None}
+
+    for child in meta:
+        tag = local_name(child.tag)
+
+        if tag == 'article-id':
+            id_type = child.get('pub-id-type')
+            if id_type == 'doi':
+                record['doi'] = (child.text or '').strip()
+            elif id_type in ['pmcid', 'pmc'] and not record['id']:
+                record['id'] = (child.text or '').strip()
+
+        elif tag == 'title-group':
+            title = find_first(child, 'article-title')
+            if title is not None:
+                record['title'] = ' '.join(element_html(title).split())
+
+        # Only the main abstract, not the graphical abstracts or teasers
+        elif tag == 'abstract' and not record['abstractText'] \
+            and child.get('abstract-type') is None:
+            record['abstractText'] = element_html(child).strip()
+
+        elif tag == 'kwd-group':
+            record['keywordList']['keyword'] += [
+                ' '.join(element_html(kwd).split()) for kwd in child
+                if local_name(kwd.tag) == 'kwd']
+
+    dates = {}
+    for child in meta:
+        if local_name(child.tag) == 'pub-date':
+            date = pub_date(child)
+            date_type = child.get('pub-type') or child.get('date-type')
+            if date is not None:
+                dates.setdefault(date_type, date)
+
+    if not dates:
+        return None
+
+    record['firstPublicationDate'] = min(dates.values())
+    year_dates = [dates[date_type] for date_type in PUB_DATE_TYPES
+                  if date_type in dates]
+    record['pubYear'] = (year_dates[0] if year_dates
+                         else record['firstPublicationDate'])[:4]
+
+    return record
+
+def open_dump(dump_path):
+
+    if dump_path.endswith('.gz'):
+        return gzip.open(dump_path, 'rb')
+
+    return open(dump_path, 'rb')
+
+def iter_dump_articles(dump_path):
+
+    '''
+    Parses a dump file incrementally and yields the record of every article.
+    The element of an article is cleared once it is read, and so are the
+    articles that were already read from the root, so the memory use does
+    not grow with the size of the dump.
+    '''
+
+    with open_dump(dump_path) as f:
+        root = None
+        for event, element in ET.iterparse(f, events = ('start', 'end')):
+            if root is None:
+                root = element
+            if event == 'end' and local_name(element.tag) == 'article':
+                record = article_record(element)
+                element.clear()
+                root.clear()
+                if record is not None:
+                    yield record
+
+# The parsed queries of a worker process, set by init_worker
+worker_queries = None
+
+def init_worker(queries, end_date):
+
+    global worker_queries
+    worker_queries = (queries, [parse_query(query) for query in queries],
+                      end_date)
+
+def parse_dump_file(dump_path):
+
+    '''
+    Gets the rows of the articles in a dump file that are published before
+    the end date and match at least one of the queries, in the row layout of
+    the harvest: the attributed query, DOI, title, abstract, pubyear, all
+    matching queries and the keywords. The PMCID is returned with every row,
+    to tell articles without a DOI apart.
+    '''
+
+    queries, parsed_queries, end_date = worker_queries
+    rows = []
+
+    for record in iter_dump_articles(dump_path):
+        if not published_before_cutoff(record['firstPublicationDate'], end_date):
+            continue
+        hit_queries = matching_queries(record, queries, parsed_queries)
+        if hit_queries:
+            rows.append((record['id'], [hit_queries[0], record['doi'],
+                                        record['title'], record['abstractText'],
+                                        record['pubYear'], hit_queries,
+                                        record['keywordList']['keyword']]))
+
+    return rows
+
+def ingest_dumps(dump_paths, corpus_dir, queries, processes = None,
+                 end_date = PUBLICATION_CUTOFF):
+
+    '''
+    Parses the dump files with a pool of processes and writes the matching
+    articles to a new corpus store in corpus_dir, one page per dump file in
+    the order of dump_paths. An article that is in more than one dump file,
+    by DOI or else by PMCID, is only written once, but the hits of all its
+    copies are kept in the provenance. Articles with neither a DOI nor a
+    PMCID can not be told apart, so every one of them is written. Returns
+    the number of written rows.
+    '''
+
+    remove_uncommitted_pages(corpus_dir, 0)
+    remove_partition_index(corpus_dir)
+    write_query_dictionary(list(queries), corpus_dir)
+    hits_path = os.path.join(corpus_dir, QUERY_HITS_FILE)
+    if os.path.exists(hits_path):
+        os.remove(hits_path)
+
+    query_ids = {query: query_id for query_id, query in enumerate(queries)}
+    row_ids = {}
+    rows_written = 0
+    hits_bytes = 0
+
+    with multiprocessing.Pool(processes, initializer = init_worker,
+                              initargs = (list(queries), end_date)) as pool:
+
+        for page_number, dump_rows in enumerate(
+                pool.imap(parse_dump_file, dump_paths)):
+
+            page_data = []
+            hits = []
+
+            for pmcid, row in dump_rows:
+                key = row[1] or pmcid
+                if key in row_ids:
+                    row_id = row_ids[key]
+                else:
+                    row_id = rows_written + len(page_data)
+                    page_data.append(row)
+                    if key:
+                        row_ids[key] = row_id
+                hits += [(row_id, query_ids[query]) for query in row[5]]
+
+            write_page(page_data, corpus_dir, page_number, rows_written,
+                       query_ids)
+            hits_bytes = append_query_hits(hits, corpus_dir)
+            rows_written += len(page_data)
+
+    write_provenance(corpus_dir, rows_written, len(queries), hits_bytes)
+    write_partition_index(corpus_dir)
+
+    return rows_written
@@ -0,0 +1,1324 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:02:11 2026
+
+This script contains functions to collect information on journal articles from
+the EuroPMC REST search webservice. The queries are independent of each other,
+so they are paged concurrently over one shared pool of keep-alive connections,
+while the pages are still written to the output file query by query, like the
+one-query-at-a-time loop we used before. Every written page is committed to a
+checkpoint journal, so an interrupted harvest can continue where it stopped.
+The publication date cutoff is part of the query sent to the server, and
+queries with many hits are split into date slices that are paged in parallel.
+Responses can be kept in an on-disk cache, from which a harvest can be
+replayed without any network access. Requests are rate limited, the rate
+backs off when the server throttles us, and failed requests are retried.
+In the two-phase mode, the pages are fetched as lite records and the full
+core records are only fetched for articles that are not in the DOI index yet.
+Pages of core records are parsed while they stream in, so a page of 1000
+records is never held as one big json dictionary. The rows are written to the
+Parquet corpus store of corpus_store_funcs.py, a file per page, which also keeps
+every query that found an article, including the duplicate hits that are not
+written as rows. An incremental
+harvest only asks for the articles published since the high-water mark of every
+query and adds them to the existing store. It also asks again for the articles
+published before the high-water mark that were updated since the last harvest,
+and overwrites their rows in the store.
+"""
+
+import os
+import gzip
+import json
+import codecs
+import time
+import bisect
+import random
+import asyncio
+import hashlib
+import datetime
+import aiohttp
+from corpus_store_funcs import (write_page, update_page_rows, page_first_row_ids,
+                                remove_uncommitted_pages, write_query_dictionary,
+                                append_query_hits, write_provenance,
+                                write_partition_index, remove_partition_index,
+                                QUERY_HITS_FILE)
+
+EUROPEPMC_SEARCH_URL = 'https://www.ebi.ac.uk/europepmc/webservices/rest/search'
+
+# NERIS - Do not accept abstracts later than April 2, 2023 for reproducibility
+# of the results. The start date is only there to close the date range.
+PUBLICATION_START = '1000-01-01'
+PUBLICATION_CUTOFF = '2023-04-02'
+
+# Number of core records asked for in one request of the two-phase mode
+CORE_BATCH_SIZE = 50
+
+# Number of bytes read from a response stream (or cached page) at once
+STREAM_CHUNK_SIZE = 65536
+
+# Number of pages of a slice that wait for the writer before the slice stops
+# paging. The slices get a slot of the concurrency limit in their order, so
+# the slice the writer waits for always has one.
+PAGE_QUEUE_SIZE = 4
+
+# *************
+# Requests and pages
+# *************
+
+def build_search_uri(query, cursor_mark, base_url = EUROPEPMC_SEARCH_URL,
+                     result_type = 'core', page_size = 1000):
+
+    '''
+    Builds the uri of one page of search results (ask for json format). The
+    base url can be changed to point the harvester to a local stub of the
+    search endpoint.
+    '''
+
+    return ('{}?query={}&resultType={}&synonym=TRUE&cursorMark={}'
+            '&pageSize={}&format=json'.format(base_url, query, result_type,
+                                              cursor_mark, page_size))
+
+def window_query(query, window):
+
+    '''
+    Restricts the query to articles first published within the date window,
+    a list of the first and the last date (both included)
+    '''
+
+    return '({})%20AND%20FIRST_PDATE:[{}%20TO%20{}]'.format(query, window[0],
+                                                          window[1])
+
+def update_query(query, update_window):
+
+    '''
+    Restricts the query to articles updated within the date window, a list
+    of the first and the last date (both included)
+    '''
+
+    return '({})%20AND%20UPDATE_DATE:[{}%20TO%20{}]'.format(query, update_window[0],
+                                                          update_window[1])
+
+def split_window(window):
+
+    '''
+    Splits a date window in two halves of (about) the same number of days
+    '''
+
+    start = datetime.date.fromisoformat(window[0])
+    end = datetime.date.fromisoformat(window[1])
+    middle = start + (end - start) // 2
+
+    return ([window[0], middle.isoformat()],
+            [(middle + datetime.timedelta(days = 1)).isoformat(), window[1]])
+
+def core_id_query(results):
+
+    '''
+    Builds a query that finds exactly the given (lite) results by their id
+    and source
+    '''
+
+    return '%20OR%20'.join('(EXT_ID:{}%20AND%20SRC:{})'.format(
+        result['id'], result['source']) for result in results)
+
+def published_before_cutoff(first_publication_date, cutoff = PUBLICATION_CUTOFF):
+
+    '''
+    NERIS - Do not accept abstracts later than April 2, 2023 for
+    reproducibility of the results. The server already applies the cutoff
+    through the date window, this is only a safeguard. An incremental harvest
+    uses the end of its own date window as the cutoff.
+    '''
+
+    parse_pub_date = [int(str_number) for str_number
+                      in first_publication_date.split('-')]
+    parse_cutoff = [int(str_number) for str_number in cutoff.split('-')]
+
+    return parse_pub_date <= parse_cutoff
+
+def parse_result_row(result, query, attribute = None,
+                     cutoff = PUBLICATION_CUTOFF):
+
+    '''
+    Gets the DOI, title, abstract and pubyear of an article, or None if it is
+    published after the cutoff date. The row starts with the query the
+    article is attributed to, followed by all queries that found it and the
+    keywords of the article. For a
+    planned query, attribute gives the original queries the article matches,
+    the first of which it is attributed to.
+    '''
+
+    if not published_before_cutoff(result['firstPublicationDate'], cutoff):
+        return None
+
+    hit_queries = [query] if attribute is None else attribute(result, query)
+
+    return [hit_queries[0],
+            result.get('doi', ''),
+            result.get('title', ''),
+            result.get('abstractText', ''),
+            result.get('pubYear', ''),
+            hit_queries,
+            result.get('keywordList', {}).get('keyword', [])]
+
+def parse_page_rows(json_dict, query, attribute = None,
+                    cutoff = PUBLICATION_CUTOFF):
+
+    '''
+    Loops over the articles in a page and gets the rows of the articles
+    published before the cutoff date
+    '''
+
+    page_data = []
+
+    for result in json_dict['resultList']['result']:
+        row = parse_result_row(result, query, attribute, cutoff)
+        if row is not None:
+            page_data.append(row)
+
+    return page_data
+
+class PageStreamParser:
+
+    '''
+    Incremental parser for a page of search results. Bytes are fed as they
+    arrive and every item of resultList.result is decoded as soon as it is
+    complete and handed to convert, of which the outcomes (except None) are
+    collected in items. All other fields, e.g. hitCount and nextCursorMark,
+    are collected in header. Only the text of the item that is currently
+    coming in is kept in memory.
+    '''
+
+    def __init__(self, convert):
+
+        self.convert = convert
+        self.items = []
+        self.header = {}
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.state = 'start'
+        self.key = None
+
+    def skip_whitespace(self):
+
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+            self.pos += 1
+
+        return self.pos < len(self.buffer)
+
+    def expect(self, char):
+
+        if self.buffer[self.pos] != char:
+            raise ValueError('Expected {} at {!r} in the page'.format(
+                char, self.buffer[self.pos:self.pos + 20]))
+
+        self.pos += 1
+
+    def decode_value(self):
+
+        '''
+        Decodes the json value at the current position. Returns False when the
+        value is not complete yet. A value is only accepted when something
+        follows it, otherwise a number could still be missing digits.
+        '''
+
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            return False, None
+
+        if end >= len(self.buffer):
+            return False, None
+
+        self.pos = end
+
+        return True, value
+
+    def decode_key(self):
+
+        '''
+        Decodes a key and its colon, returns False when they are not complete
+        '''
+
+        start = self.pos
+        complete, key = self.decode_value()
+        if not complete or not self.skip_whitespace():
+            self.pos = start
+            return False
+
+        self.expect(':')
+        self.key = key
+
+        return True
+
+    def step(self):
+
+        '''
+        Takes one step through the page, returns False when more text is needed
+        '''
+
+        if self.state == 'done' or not self.skip_whitespace():
+            return False
+
+        char = self.buffer[self.pos]
+
+        if self.state in ['start', 'result_list', 'result']:
+            self.expect({'start': '{', 'result_list': '{',
+                         'result': '['}[self.state])
+            self.state = {'start': 'key', 'result_list': 'result_list_key',
+                          'result': 'item'}[self.state]
+            return True
+
+        if char == ',':
+            self.pos += 1
+            return True
+
+        if self.state == 'key':
+            if char == '}':
+                self.pos += 1
+                self.state = 'done'
+                return True
+            if not self.decode_key():
+                return False
+            self.state = 'result_list' if self.key == 'resultList' else 'value'
+            return True
+
+        if self.state == 'result_list_key':
+            if char == '}':
+                self.pos += 1
+                self.state = 'key'
+                return True
+            if not self.decode_key():
+                return False
+            self.state = 'result' if self.key == 'result' else 'result_list_value'
+            return True
+
+        if self.state == 'item' and char == ']':
+            self.pos += 1
+            self.state = 'result_list_key'
+            return True
+
+        complete, value = self.decode_value()
+        if not complete:
+            return False
+
+        if self.state == 'value':
+            self.header[self.key] = value
+            self.state = 'key'
+        elif self.state == 'result_list_value':
+            self.state = 'result_list_key'
+        else:
+            item = self.convert(value)
+            if item is not None:
+                self.items.append(item)
+
+        return True
+
+    def feed(self, chunk):
+
+        self.buffer += self.text_decoder.decode(chunk)
+
+        while self.step():
+            pass
+
+        # Drop the text that has been parsed already
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+
+    def close(self):
+
+        '''
+        Checks that the whole page was parsed and returns header and items
+        '''
+
+        self.buffer += self.text_decoder.decode(b'', final = True)
+
+        while self.step():
+            pass
+
+        if self.state != 'done':
+            raise ValueError('The page ended before it was complete')
+
+        return self.header, self.items
+
+# HTTP status codes after which a request is tried again, 429 and 503 also
+# mean that we are asking too much of the server
+RETRY_STATUS = [429, 500, 502, 503, 504]
+THROTTLE_STATUS = [429, 503]
+
+class RateLimiter:
+
+    '''
+    Token bucket that hands out at most rate requests per second. The rate is
+    halved every time the server throttles us and grows back a little with
+    every successful request, so it settles just below what the server allows.
+    '''
+
+    def __init__(self, max_rate = 10, min_rate = 0.5, increase = 0.05):
+
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.rate = max_rate
+        self.tokens = 1
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(max(self.rate, 1), self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def succeeded(self):
+
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self):
+
+        self.rate = max(self.min_rate, self.rate / 2)
+
+class EuropePMCClient:
+
+    '''
+    Sends the http requests to the REST webservice over a single session.
+    With a cache_dir, every response body is stored gzipped under the sha256
+    of its uri, so a page is only downloaded once. With offline, pages are
+    only read from that cache and a missing page is an error. Requests wait
+    for the rate limiter, time out after timeout seconds and are retried up
+    to max_retries times with a jittered exponential backoff.
+    '''
+
+    def __init__(self, session = None, cache_dir = None, offline = False,
+                 max_rate = 10, max_retries = 5, timeout = 120,
+                 backoff = 1, max_backoff = 60):
+
+        if offline and cache_dir is None:
+            raise ValueError('Replaying a harvest offline needs a cache_dir')
+
+        self.session = session
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.rate_limiter = RateLimiter(max_rate)
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total = timeout)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0, 'bytes': 0,
+                      'cached': 0, 'missing': 0}
+        self.start_time = time.monotonic()
+
+    def cache_path(self, uri):
+
+        key = hashlib.sha256(uri.encode('utf-8')).hexdigest()
+
+        return os.path.join(self.cache_dir, key[:2], key + '.json.gz')
+
+    def read_cache(self, path):
+
+        with gzip.open(path, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def write_cache(self, path, body):
+
+        '''
+        Writes to a temporary file first, so a cached page is never partial
+        '''
+
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(body.encode('utf-8'))
+
+        os.replace(tmp_path, path)
+
+    def backoff_delay(self, attempt, retry_after = None):
+
+        '''
+        Waits as long as the server asks us to, otherwise a random part of an
+        exponentially growing delay so the retries do not come in waves
+        '''
+
+        if retry_after is not None and retry_after.isdigit():
+            return min(self.max_backoff, int(retry_after))
+
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    async def request(self, uri):
+
+        '''
+        Sends the request until it succeeds and returns the body. Timeouts,
+        connection errors, bodies that are not json and the status codes in
+        RETRY_STATUS are retried, other status codes are raised right away.
+        '''
+
+        for attempt in range(self.max_retries + 1):
+
+            await self.rate_limiter.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+
+            try:
+                async with self.session.get(uri, timeout = self.timeout) as req:
+                    raw_body = await req.read()
+                    self.stats['bytes'] += len(raw_body)
+
+                    if req.status in THROTTLE_STATUS:
+                        self.stats['throttled'] += 1
+                        self.rate_limiter.throttled()
+
+                    if req.status in RETRY_STATUS:
+                        retry_after = req.headers.get('Retry-After')
+                        error = aiohttp.ClientResponseError(
+                            req.request_info, req.history, status = req.status,
+                            message = req.reason, headers = req.headers)
+                    else:
+                        req.raise_for_status()
+                        body = raw_body.decode('utf-8')
+                        json_dict = json.loads(body)
+                        self.rate_limiter.succeeded()
+                        return body, json_dict
+
+            except aiohttp.ClientResponseError:
+                raise
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = e
+
+            if attempt == self.max_retries:
+                raise error
+
+            self.stats['retries'] += 1
+            await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+
+    async def fetch_page(self, uri):
+
+        '''
+        Gets the json body of the uri from the cache or from the webservice
+        and parses it
+        '''
+
+        path = None if self.cache_dir is None else self.cache_path(uri)
+
+        if path is not None and os.path.exists(path):
+            self.stats['cached'] += 1
+            return json.loads(self.read_cache(path))
+
+        if self.offline:
+            raise FileNotFoundError('There is no cached response for {}'.format(uri))
+
+        body, json_dict = await self.request(uri)
+
+        # Only successful responses end up here, so they can be kept
+        if path is not None:
+            self.write_cache(path, body)
+
+        return json_dict
+
+    async def stream_page(self, uri, convert):
+
+        '''
+        Like fetch_page, but the page is parsed while it streams in from the
+        webservice or the cache, see PageStreamParser. Returns the header of
+        the page and the converted result items. The body goes to the cache
+        chunk by chunk, so it is never in memory as a whole either.
+        '''
+
+        path = None if self.cache_dir is None else self.cache_path(uri)
+
+        if path is not None and os.path.exists(path):
+            self.stats['cached'] += 1
+            parser = PageStreamParser(convert)
+            with gzip.open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                    parser.feed(chunk)
+            return parser.close()
+
+        if self.offline:
+            raise FileNotFoundError('There is no cached response for {}'.format(uri))
+
+        for attempt in range(self.max_retries + 1):
+
+            await self.rate_limiter.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            cache_file = None
+
+            try:
+                async with self.session.get(uri, timeout = self.timeout) as req:
+
+                    if req.status in THROTTLE_STATUS:
+                        self.stats['throttled'] += 1
+                        self.rate_limiter.throttled()
+
+                    if req.status in RETRY_STATUS:
+                        retry_after = req.headers.get('Retry-After')
+                        error = aiohttp.ClientResponseError(
+                            req.request_info, req.history, status = req.status,
+                            message = req.reason, headers = req.headers)
+                    else:
+                        req.raise_for_status()
+                        parser = PageStreamParser(convert)
+                        if path is not None:
+                            os.makedirs(os.path.dirname(path), exist_ok = True)
+                            cache_file = gzip.open(path + '.tmp', 'wb')
+
+                        async for chunk in req.content.iter_chunked(STREAM_CHUNK_SIZE):
+                            self.stats['bytes'] += len(chunk)
+                            parser.feed(chunk)
+                            if cache_file is not None:
+                                cache_file.write(chunk)
+
+                        page = parser.close()
+                        if cache_file is not None:
+                            cache_file.close()
+                            os.replace(path + '.tmp', path)
+
+                        self.rate_limiter.succeeded()
+                        return page
+
+            except aiohttp.ClientResponseError:
+                raise
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error = e
+
+            finally:
+                if cache_file is not None:
+                    cache_file.close()
+
+            if attempt == self.max_retries:
+                raise error
+
+            self.stats['retries'] += 1
+            await asyncio.sleep(self.backoff_delay(attempt, retry_after))
+
+    async def fetch_core_records(self, results, base_url = EUROPEPMC_SEARCH_URL):
+
+        '''
+        Gets the core records of the given lite results, in batches of
+        CORE_BATCH_SIZE. Core records are cached one by one under their source
+        and id, so they do not depend on which other records were asked for
+        in the same batch. Returns a dictionary from (source, id) to record.
+        Offline, a record that is not cached must come from the cached
+        response of its own request, otherwise it is an error as for pages.
+        '''
+
+        records = {}
+        missing = []
+
+        for result in results:
+            key = (result['source'], result['id'])
+            path = (None if self.cache_dir is None
+                    else self.cache_path('core:{}:{}'.format(*key)))
+
+            if path is not None and os.path.exists(path):
+                self.stats['cached'] += 1
+                records[key] = json.loads(self.read_cache(path))
+
+            elif self.offline:
+                record = await self.fetch_core_record(result, base_url)
+                if record is not None:
+                    records[key] = record
+
+            else:
+                missing.append(result)
+
+        # The batches are sent one after the other, as the page they belong
+        # to holds a single slot of the concurrency limit
+        for start in range(0, len(missing), CORE_BATCH_SIZE):
+            body, json_dict = await self.request(build_search_uri(
+                core_id_query(missing[start:start + CORE_BATCH_SIZE]), '*',
+                base_url, page_size = CORE_BATCH_SIZE))
+            for record in json_dict['resultList']['result']:
+                key = (record['source'], record['id'])
+                records[key] = record
+                if self.cache_dir is not None:
+                    self.write_cache(self.cache_path('core:{}:{}'.format(*key)),
+                                     json.dumps(record))
+
+        # A batch response can leave out a record, which is then asked for on
+        # its own before the article is given up
+        for result in missing:
+            key = (result['source'], result['id'])
+            if key not in records:
+                record = await self.fetch_core_record(result, base_url)
+                if record is not None:
+                    records[key] = record
+
+        return records
+
+    async def fetch_core_record(self, result, base_url = EUROPEPMC_SEARCH_URL):
+
+        '''
+        Gets the core record of a single lite result. The response is cached
+        as a page under its uri, also when it holds no record, so a replay
+        finds the same answer. Returns None when there is no core record.
+        '''
+
+        json_dict = await self.fetch_page(build_search_uri(
+            core_id_query([result]), '*', base_url, page_size = 1))
+
+        for record in json_dict['resultList']['result']:
+            if (record['source'], record['id']) == (result['source'], result['id']):
+                return record
+
+        return None
+
+    def report(self):
+
+        '''
+        Summarizes the requests sent so far
+        '''
+
+        seconds = time.monotonic() - self.start_time
+
+        return ('{} requests ({:.2f} per second), {} retries, {} throttled, '
+                '{:.1f} MB downloaded, {} pages from the cache, '
+                '{} core records missing'.format(
+                    self.stats['requests'], self.stats['requests'] / seconds,
+                    self.stats['retries'], self.stats['throttled'],
+                    self.stats['bytes'] / 1e6, self.stats['cached'],
+                    self.stats['missing']))
+
+async def fetch_hit_count(client, query, base_url = EUROPEPMC_SEARCH_URL):
+
+    '''
+    Asks for a single id of the query, just to get the hitCount
+    '''
+
+    json_dict = await client.fetch_page(build_search_uri(
+        query, '*', base_url, result_type = 'idlist', page_size = 1))
+
+    return int(json_dict['hitCount'])
+
+async def slice_query(client, semaphore, query, window, max_slice_hits,
+                      base_url = EUROPEPMC_SEARCH_URL):
+
+    '''
+    Splits the date window of a query in halves until every slice has at most
+    max_slice_hits hits, so big queries are paged by several cursors at once.
+    Slices without hits are left out.
+    '''
+
+    async with semaphore:
+        hit_count = await fetch_hit_count(client, window_query(query, window),
+                                          base_url)
+
+    if hit_count == 0:
+        return []
+
+    if hit_count <= max_slice_hits or window[0] == window[1]:
+        return [window]
+
+    halves = await asyncio.gather(*[
+        slice_query(client, semaphore, query, half, max_slice_hits, base_url)
+        for half in split_window(window)])
+
+    return halves[0] + halves[1]
+
+# *************
+# Checkpoint journal
+# *************
+
+def new_checkpoint(queries, windows, query_list, end_date = PUBLICATION_CUTOFF,
+                   state = None, update_window = None, update_windows = None):
+
+    '''
+    Creates an empty journal: per date slice of a query the cursorMark of the
+    next page to fetch, the number of rows written so far and whether the
+    slice is done. pages and rows_written are the number of pages and rows
+    in the corpus store, index_bytes and hits_bytes are the sizes of the DOI
+    index file and the query hit log after the last committed page, and
+    query_dictionary holds the queries of the query ids, starting with
+    query_list. An incremental harvest starts from the store, DOI index and
+    query dictionary of the harvest state instead of from scratch, and has
+    the slices of update_windows as well, per query the date slices of the
+    articles that were updated within update_window. The rows of the
+    updated articles that are overwritten are kept in updated_row_ids.
+    '''
+
+    incremental = state is not None
+    if state is None:
+        state = {'pages': 0, 'rows_written': 0, 'index_bytes': 0,
+                 'hits_bytes': 0, 'query_dictionary': []}
+
+    query_dictionary = list(state['query_dictionary'])
+    query_dictionary += [query for query in query_list
+                         if query not in query_dictionary]
+
+    if update_windows is None:
+        update_windows = [[] for _ in queries]
+
+    return {'pages': state['pages'], 'rows_written': state['rows_written'],
+            'index_bytes': state['index_bytes'],
+            'hits_bytes': state['hits_bytes'],
+            'query_dictionary': query_dictionary,
+            'first_row_id': state['rows_written'], 'end_date': end_date,
+            'harvest_date': datetime.date.today().isoformat(),
+            'incremental': incremental,
+            'query_list': list(queries),
+            'updated_row_ids': [],
+            'queries': [{'query': query, 'window': window, 'cursor_mark': '*',
+                         'rows': 0, 'done': False, 'update_window': None}
+                        for query, query_windows in zip(queries, windows)
+                        for window in query_windows] +
+                       [{'query': query, 'window': window, 'cursor_mark': '*',
+                         'rows': 0, 'done': False, 'update_window': update_window}
+                        for query, query_windows in zip(queries, update_windows)
+                        for window in query_windows]}
+
+def load_checkpoint(checkpoint_path, queries):
+
+    '''
+    Loads the journal of an earlier run, which only makes sense for the very
+    same list of queries
+    '''
+
+    with open(checkpoint_path, 'r', encoding = 'utf-8') as f:
+        checkpoint = json.load(f)
+
+    if checkpoint['query_list'] != list(queries):
+        raise ValueError('The checkpoint journal {} was written for a different '
+                         'list of queries'.format(checkpoint_path))
+
+    return checkpoint
+
+def save_checkpoint(checkpoint, checkpoint_path):
+
+    '''
+    Writes the journal to a temporary file and moves it over the old one, so
+    the journal on disk is always either the old or the new state
+    '''
+
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding = 'utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, checkpoint_path)
+
+# *************
+# Harvest state
+# *************
+
+def load_harvest_state(state_path):
+
+    '''
+    Loads the state of the corpus store after the last completed harvest:
+    its pages, rows, DOI index and hit log sizes, its query dictionary, the
+    high-water mark of every query,
+    i.e. the last FIRST_PDATE that has been harvested, and per harvest run
+    the row ids it added, the rows of updated articles it overwrote and the
+    date it started
+    '''
+
+    with open(state_path, 'r', encoding = 'utf-8') as f:
+        return json.load(f)
+
+def finish_harvest_state(state, checkpoint):
+
+    '''
+    Adds a completed harvest to the state. A full harvest replaces the store,
+    so it starts a new state.
+    '''
+
+    if state is None or not checkpoint['incremental']:
+        state = {'high_water_marks': {}, 'runs': []}
+
+    high_water_marks = dict(state['high_water_marks'])
+    high_water_marks.update({query: checkpoint['end_date']
+                             for query in checkpoint['query_list']})
+
+    return {'pages': checkpoint['pages'],
+            'rows_written': checkpoint['rows_written'],
+            'index_bytes': checkpoint['index_bytes'],
+            'hits_bytes': checkpoint['hits_bytes'],
+            'query_dictionary': checkpoint['query_dictionary'],
+            'high_water_marks': high_water_marks,
+            'runs': state['runs'] + [{
+                'end_date': checkpoint['end_date'],
+                'harvest_date': checkpoint['harvest_date'],
+                'first_row_id': checkpoint['first_row_id'],
+                'rows': checkpoint['rows_written'] - checkpoint['first_row_id'],
+                'updated_row_ids': sorted(set(checkpoint['updated_row_ids']))}]}
+
+def last_harvest_date(state):
+
+    '''
+    Gives the date the last harvest started, from which on updated articles
+    are asked for again. A state of before the harvest date was kept only
+    has the end date of the harvest.
+    '''
+
+    last_run = state['runs'][-1]
+
+    return last_run.get('harvest_date', last_run['end_date'])
+
+def new_row_ids(state_path):
+
+    '''
+    Gives the row ids, which are the doc_ids downstream, that the last
+    harvest run added to the corpus store
+    '''
+
+    last_run = load_harvest_state(state_path)['runs'][-1]
+
+    return list(range(last_run['first_row_id'],
+                      last_run['first_row_id'] + last_run['rows']))
+
+def updated_row_ids(state_path):
+
+    '''
+    Gives the row ids of the articles that were updated since the harvest
+    before and of which the last harvest run overwrote the rows
+    '''
+
+    return load_harvest_state(state_path)['runs'][-1].get('updated_row_ids', [])
+
+def truncate_file(path, size):
+
+    '''
+    Cuts a file back to the size it had at the last committed page, this drops
+    whatever was (partly) written when the previous run died
+    '''
+
+    if not os.path.exists(path):
+        open(path, 'w').close()
+
+    with open(path, 'r+b') as f:
+        f.truncate(size)
+
+# *************
+# DOI index
+# *************
+
+def load_doi_index(doi_index_path, index_bytes):
+
+    '''
+    Reads the committed part of the DOI index file, one DOI per line, into a
+    dictionary from the DOI to the row id of the article, which is the line
+    number. Only the keys are kept in memory, not the articles themselves.
+    '''
+
+    doi_index = {}
+
+    if index_bytes == 0:
+        return doi_index
+
+    with open(doi_index_path, 'rb') as f:
+        dois = f.read(index_bytes).decode('utf-8').split('\n')[:-1]
+
+    for row_id, doi in enumerate(dois):
+        doi_index.setdefault(doi, row_id)
+
+    return doi_index
+
+def append_doi_index(dois, doi_index_path):
+
+    '''
+    Appends the DOIs of a page to the index file and returns its new size
+    '''
+
+    with open(doi_index_path, 'ab') as f:
+        f.write(''.join(doi + '\n' for doi in dois).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+def update_rows(corpus_dir, updated_rows, page_starts):
+
+    '''
+    Overwrites the rows of updated_rows, a dictionary from row id to the row
+    of the updated article, page by page. page_starts holds the page numbers
+    of the corpus store and the first row id of every page.
+    '''
+
+    page_numbers, first_row_ids = page_starts
+
+    pages = {}
+    for row_id, row in updated_rows.items():
+        page_number = page_numbers[bisect.bisect_right(first_row_ids, row_id) - 1]
+        pages.setdefault(page_number, {})[row_id] = row
+
+    for page_number, rows in pages.items():
+        update_page_rows(corpus_dir, page_number, rows)
+
+# *************
+# Harvesting
+# *************
+
+async def fetch_new_core_page(client, uri, doi_index, base_url,
+                              cutoff = PUBLICATION_CUTOFF):
+
+    '''
+    Gets the lite page of the uri and replaces its results by the core
+    records of the articles that are published before the cutoff and are not
+    in the DOI index yet. The index only holds DOIs of pages that are written
+    before this page, so articles that keep their lite result here are
+    dropped by the writer anyway, after it has noted the hit of the query.
+    Which articles are new depends on how far the writer is, so with a cache
+    the keys of the new articles are cached with the page, and a replay asks
+    for exactly the same core records. New articles without a core record,
+    not even when asked for on their own, are left out and counted as
+    missing in the report of the client.
+    '''
+
+    json_dict = await client.fetch_page(uri)
+    results = [result for result in json_dict['resultList']['result']
+               if published_before_cutoff(result['firstPublicationDate'],
+                                          cutoff)]
+
+    new_path = (None if client.cache_dir is None
+                else client.cache_path('new:' + uri))
+    if client.offline:
+        if not os.path.exists(new_path):
+            raise FileNotFoundError('There are no cached new articles for '
+                                    '{}'.format(uri))
+        new_keys = set(tuple(key) for key
+                       in json.loads(client.read_cache(new_path)))
+    else:
+        new_keys = set((result['source'], result['id']) for result in results
+                       if result.get('doi', '') not in doi_index)
+        if new_path is not None:
+            client.write_cache(new_path, json.dumps(sorted(new_keys)))
+
+    new_results = [result for result in results
+                   if (result['source'], result['id']) in new_keys]
+
+    records = await client.fetch_core_records(new_results, base_url)
+    client.stats['missing'] += len(new_keys - records.keys())
+
+    core_page = dict(json_dict)
+    core_page['resultList'] = {'result': [
+        records[(result['source'], result['id'])]
+        if (result['source'], result['id']) in new_keys else result
+        for result in results
+        if (result['source'], result['id']) not in new_keys
+        or (result['source'], result['id']) in records]}
+
+    return core_page
+
+async def harvest_query(client, semaphore, query, window, cursor_mark,
+                        page_queue, base_url, attribute = None,
+                        doi_index = None, update_window = None):
+
+    '''
+    Pages through the results of a single date slice of a query with the
+    cursorMark, starting at the given cursor_mark, and puts the rows of every
+    page together with the nextCursorMark on the queue of this slice. None is
+    put on the queue after the final page. With a doi_index, the pages are
+    fetched as lite records first and only the new articles are fetched as
+    core records. With an update_window, only the articles updated within
+    that window are asked for, of which all core records are fetched, as
+    the articles that are already harvested are the ones to update.
+    '''
+
+    result_type = 'core' if doi_index is None else 'lite'
+    search_query = query if update_window is None else update_query(query, update_window)
+    if doi_index is not None and update_window is not None:
+        doi_index = {}
+
+    async with semaphore:
+
+        cMark = cursor_mark
+
+        while True:
+
+            uri = build_search_uri(window_query(search_query, window), cMark,
+                                   base_url, result_type = result_type)
+
+            if doi_index is None:
+                json_dict, page_data = await client.stream_page(
+                    uri, lambda result: parse_result_row(result, query,
+                                                         attribute, window[1]))
+            else:
+                json_dict = await fetch_new_core_page(
+                    client, uri, doi_index, base_url, window[1])
+                page_data = parse_page_rows(json_dict, query, attribute,
+                                            window[1])
+
+            # Check if we are on the last page by checking the nextCursorMark,
+            # a cursorMark that does not move also means there is nothing left
+            if (not 'nextCursorMark' in json_dict or
+                json_dict['nextCursorMark'] == cMark):
+                await page_queue.put((page_data, None))
+                break
+
+            cMark = json_dict['nextCursorMark']
+            await page_queue.put((page_data, cMark))
+
+    await page_queue.put(None)
+
+async def write_pages_in_order(page_queues, corpus_dir, checkpoint,
+                               checkpoint_path, doi_index, doi_index_path):
+
+    '''
+    Takes the pages from the queues slice by slice, so all rows of a query
+    are written before the rows of the next query. DOIs that are already
+    in the index are dropped before the page is written to the corpus store,
+    after which the page is committed to the journal. The queries that found
+    an article are logged as hits, also when the article itself is dropped.
+    Articles without a DOI can not be told apart, so only the hits of the
+    ones that are written are logged. The articles of an update slice that
+    are in the index overwrite their rows and the others are written as new
+    rows, except for those without a DOI, which may well be in the store.
+    '''
+
+    query_ids = {query: query_id for query_id, query
+                 in enumerate(checkpoint['query_dictionary'])}
+
+    page_starts = ([], [])
+    if any(entry['update_window'] is not None for entry in checkpoint['queries']):
+        page_starts = page_first_row_ids(corpus_dir)
+
+    for page_queue, entry in zip(page_queues, checkpoint['queries']):
+
+        while True:
+
+            page = await page_queue.get()
+            if page is None:
+                break
+
+            page_data, next_cursor_mark = page
+
+            # A planned query that no original query matches gets a new id
+            new_queries = set(query for row in page_data for query in row[5]
+                              if query not in query_ids)
+            if new_queries:
+                for query in sorted(new_queries):
+                    query_ids[query] = len(checkpoint['query_dictionary'])
+                    checkpoint['query_dictionary'].append(query)
+                write_query_dictionary(checkpoint['query_dictionary'], corpus_dir)
+
+            updated_rows = {}
+            if entry['update_window'] is not None:
+                page_data = [row for row in page_data if row[1] != '']
+                updated_rows = {doi_index[row[1]]: row for row in page_data
+                                if row[1] in doi_index}
+
+            # Compare for duplicates with the DOIs written before this page
+            hits = [(doi_index[row[1]], query_ids[query])
+                    for row in page_data if row[1] in doi_index and row[1] != ''
+                    for query in row[5]]
+            page_data = [row for row in page_data if row[1] not in doi_index]
+            page_dois = [row[1] for row in page_data]
+
+            for row_id, row in enumerate(page_data, checkpoint['rows_written']):
+                doi_index.setdefault(row[1], row_id)
+                hits += [(row_id, query_ids[query]) for query in row[5]]
+
+            write_page(page_data, corpus_dir, checkpoint['pages'],
+                       checkpoint['rows_written'], query_ids)
+            if page_data:
+                page_starts[0].append(checkpoint['pages'])
+                page_starts[1].append(checkpoint['rows_written'])
+            update_rows(corpus_dir, updated_rows, page_starts)
+            checkpoint['updated_row_ids'] += sorted(updated_rows)
+            checkpoint['index_bytes'] = append_doi_index(page_dois, doi_index_path)
+            checkpoint['hits_bytes'] = append_query_hits(hits, corpus_dir)
+            checkpoint['pages'] += 1
+            checkpoint['rows_written'] += len(page_data)
+            entry['rows'] += len(page_data)
+
+            if next_cursor_mark is None:
+                entry['done'] = True
+            else:
+                entry['cursor_mark'] = next_cursor_mark
+
+            save_checkpoint(checkpoint, checkpoint_path)
+
+async def no_windows():
+
+    return []
+
+async def run_harvest(client, semaphore, queries, corpus_dir, query_list,
+                      checkpoint, checkpoint_path, doi_index_path,
+                      max_slice_hits, base_url, attribute, two_phase,
+                      state, state_path, end_date):
+
+    '''
+    Without a journal, the queries are sliced first and a new journal is
+    started. Slices that are done according to the journal are not requested
+    again, the others are paged while the writer commits their pages. With a
+    state, every query only gets the dates from its high-water mark onwards.
+    The high-water mark day itself is harvested again, as articles of that
+    day may have been added after the last run, and the DOI index drops the
+    articles we already have. The articles up to the high-water mark that
+    were updated since the last harvest started are asked for again in
+    update slices. Once all slices are done, the hit log is
+    folded into the provenance of the articles and the state is updated.
+    '''
+
+    if checkpoint is None:
+        high_water_marks = {} if state is None else state['high_water_marks']
+        windows = await asyncio.gather(*[
+            slice_query(client, semaphore, query,
+                        [high_water_marks.get(query, PUBLICATION_START), end_date],
+                        max_slice_hits, base_url)
+            for query in queries])
+
+        update_window = None
+        update_windows = None
+        if state is not None:
+            update_window = [last_harvest_date(state),
+                             datetime.date.today().isoformat()]
+            update_windows = await asyncio.gather(*[
+                slice_query(client, semaphore, update_query(query, update_window),
+                            [PUBLICATION_START, high_water_marks[query]],
+                            max_slice_hits, base_url)
+                if query in high_water_marks else no_windows()
+                for query in queries])
+
+        checkpoint = new_checkpoint(queries, windows, query_list, end_date,
+                                    state, update_window, update_windows)
+        save_checkpoint(checkpoint, checkpoint_path)
+
+        # A full harvest empties the store, so the old state no longer holds
+        if state is None and state_path is not None and os.path.exists(state_path):
+            os.remove(state_path)
+
+    remove_uncommitted_pages(corpus_dir, checkpoint['pages'])
+    remove_partition_index(corpus_dir)
+    write_query_dictionary(checkpoint['query_dictionary'], corpus_dir)
+    truncate_file(doi_index_path, checkpoint['index_bytes'])
+    truncate_file(os.path.join(corpus_dir, QUERY_HITS_FILE),
+                  checkpoint['hits_bytes'])
+    doi_index = load_doi_index(doi_index_path, checkpoint['index_bytes'])
+
+    page_queues = [asyncio.Queue(maxsize = PAGE_QUEUE_SIZE)
+                   for _ in checkpoint['queries']]
+
+    tasks = [harvest_query(client, semaphore, entry['query'],
+                           entry['window'], entry['cursor_mark'],
+                           page_queue, base_url, attribute,
+                           doi_index if two_phase else None,
+                           entry['update_window'])
+             for entry, page_queue in zip(checkpoint['queries'], page_queues)
+             if not entry['done']]
+
+    for entry, page_queue in zip(checkpoint['queries'], page_queues):
+        if entry['done']:
+            page_queue.put_nowait(None)
+
+    tasks.append(write_pages_in_order(page_queues, corpus_dir, checkpoint,
+                                      checkpoint_path, doi_index,
+                                      doi_index_path))
+
+    await asyncio.gather(*tasks)
+
+    write_provenance(corpus_dir, checkpoint['rows_written'],
+                     len(checkpoint['query_dictionary']),
+                     checkpoint['hits_bytes'])
+    write_partition_index(corpus_dir)
+
+    if state_path is not None:
+        save_checkpoint(finish_harvest_state(state, checkpoint), state_path)
+
+async def harvest_queries_async(queries, corpus_dir, query_list, checkpoint,
+                                checkpoint_path, doi_index_path,
+                                max_concurrency = 8, max_slice_hits = 10000,
+                                base_url = EUROPEPMC_SEARCH_URL,
+                                attribute = None, cache_dir = None,
+                                replay = False, client_options = None,
+                                two_phase = False, state = None,
+                                state_path = None,
+                                end_date = PUBLICATION_CUTOFF):
+
+    '''
+    Runs at most max_concurrency date slices at the same time over a single
+    session, so the connections are kept alive and reused between pages.
+    A replay does not open a session at all, every page comes from the cache.
+    Returns the report of the client.
+    '''
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    harvest_args = (semaphore, queries, corpus_dir, query_list, checkpoint,
+                    checkpoint_path, doi_index_path, max_slice_hits, base_url,
+                    attribute, two_phase, state, state_path, end_date)
+
+    if client_options is None:
+        client_options = {}
+
+    if replay:
+        client = EuropePMCClient(None, cache_dir, offline = True,
+                                 **client_options)
+        await run_harvest(client, *harvest_args)
+        return client.report()
+
+    connector = aiohttp.TCPConnector(limit = max_concurrency)
+
+    async with aiohttp.ClientSession(connector = connector) as session:
+        client = EuropePMCClient(session, cache_dir, **client_options)
+        await run_harvest(client, *harvest_args)
+
+    return client.report()
+
+def harvest_queries(queries, corpus_dir, checkpoint_path, doi_index_path,
+                    resume = False, max_concurrency = 8, max_slice_hits = 10000,
+                    base_url = EUROPEPMC_SEARCH_URL, attribute = None,
+                    cache_dir = None, replay = False, client_options = None,
+                    two_phase = False, query_list = None, state_path = None,
+                    incremental = False, end_date = PUBLICATION_CUTOFF):
+
+    '''
+    Harvests all queries and writes the rows to the corpus store in
+    corpus_dir, see corpus_store_funcs.py. The query ids are the positions
+    of the queries in query_list, which defaults to queries. With
+    resume, the harvest continues from the journal at checkpoint_path if there
+    is one, otherwise the corpus store and the DOI index are started from
+    scratch. Queries with more than max_slice_hits hits are split into date
+    slices. When the queries are planned queries, attribute(result, planned
+    query) gives the original queries the article matches.
+    Responses are cached in cache_dir, and with replay they are only read
+    from there. client_options are passed on to EuropePMCClient, e.g.
+    max_rate, and the report of the client is returned. With two_phase, the
+    pages are fetched as lite records and only new articles are fetched as
+    core records. Articles first published up to end_date are harvested.
+    A completed harvest writes its state to state_path. With incremental,
+    only articles published after the high-water marks of that state are
+    harvested and added to the existing corpus store, see new_row_ids, and
+    the articles updated since the last harvest overwrite their rows, see
+    updated_row_ids.
+    '''
+
+    if query_list is None:
+        query_list = queries
+
+    state = None
+    if incremental:
+        if state_path is None or not os.path.exists(state_path):
+            raise ValueError('An incremental harvest needs the state of a '
+                             'completed harvest at {}'.format(state_path))
+        state = load_harvest_state(state_path)
+
+    checkpoint = None
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path, queries)
+        if checkpoint['incremental'] != incremental:
+            raise ValueError('The checkpoint journal {} was written for a '
+                             'harvest that was {}incremental'.format(
+                                 checkpoint_path,
+                                 '' if checkpoint['incremental'] else 'not '))
+
+    return asyncio.run(harvest_queries_async(queries, corpus_dir, query_list,
+                                             checkpoint, checkpoint_path,
+                                             doi_index_path,
+                                             max_concurrency, max_slice_hits,
+                                             base_url, attribute, cache_dir,
+                                             replay, client_options,
+                                             two_phase, state, state_path,
+                                             end_date))
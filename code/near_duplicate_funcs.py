@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 00:02:37 2026
+
+This script contains functions to find abstracts that are near duplicates of
+each other, like the preprint, the conference and the journal version of the
+same abstract, which the exact deduplication on the abstract and the DOI
+does not find. Every cleaned abstract is turned into the set of its word
+shingles, and a MinHash signature of that set estimates the Jaccard
+similarity between two abstracts. The signatures are split into bands and
+put in the buckets of a locality-sensitive hashing index, so an abstract is
+only compared with the abstracts that share a bucket with it and not with
+the whole corpus. The number of bands is chosen for the Jaccard threshold.
+
+The abstracts are added to the index in doc_id order, and an abstract that
+is similar enough to an abstract that was kept before is dropped as its near
+duplicate. A cluster is an abstract that is kept with the abstracts that are
+dropped as its near duplicates.
+"""
+
+import zlib
+import numpy
+import pandas
+
+# Number of hash functions of a MinHash signature
+NUM_PERM = 128
+
+# Number of words in a shingle
+SHINGLE_SIZE = 3
+
+MERSENNE_PRIME = numpy.uint64((1 << 61) - 1)
+MAX_HASH = numpy.uint64((1 << 32) - 1)
+
+def shingle_hashes(text, shingle_size = SHINGLE_SIZE):
+
+    '''
+    Gives the 32 bit hashes of the word shingles of a text. A text with fewer
+    words than the shingle size is a single shingle.
+    '''
+
+    words = text.split()
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + shingle_size])
+                    for i in range(len(words) - shingle_size + 1)]
+
+    return numpy.unique(numpy.array([zlib.crc32(shingle.encode('utf-8'))
+                                     for shingle in shingles], dtype = numpy.uint64))
+
+class MinHasher:
+
+    '''
+    Makes MinHash signatures with num_perm universal hash functions
+    (a * x + b) mod p. Hashers with the same seed give the same signatures,
+    also in other processes.
+    '''
+
+    def __init__(self, num_perm = NUM_PERM, seed = 1, shingle_size = SHINGLE_SIZE):
+
+        generator = numpy.random.RandomState(seed)
+        self.a = generator.randint(1, 1 << 32, size = num_perm, dtype = numpy.uint64)
+        self.b = generator.randint(0, 1 << 32, size = num_perm, dtype = numpy.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, text):
+
+        hashes = shingle_hashes(text, self.shingle_size)
+        permuted = (numpy.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+
+        return permuted.min(axis = 0).astype(numpy.uint32)
+
+def lsh_bands(threshold, num_perm = NUM_PERM, false_positive_weight = 0.1):
+
+    '''
+    Chooses the number of bands and rows per band of the index for a Jaccard
+    threshold. Two abstracts with Jaccard similarity s share a bucket with
+    probability 1 - (1 - s ** rows) ** bands, and the bands are chosen that
+    give the smallest weighted sum of the probability to compare abstracts
+    below the threshold and to miss abstracts above it. A comparison only
+    costs a look at the signatures, so missing abstracts weighs more.
+    '''
+
+    similarities = numpy.linspace(0, 1, 1001)
+    below = similarities < threshold
+    best = None
+
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        candidate = 1 - (1 - similarities ** rows) ** bands
+        error = (false_positive_weight * candidate[below].sum()
+                 + (1 - false_positive_weight) * (1 - candidate[~below]).sum())
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+
+    return best[1], best[2]
+
+class NearDuplicateIndex:
+
+    '''
+    Locality-sensitive hashing index of the MinHash signatures of the kept
+    abstracts. Only the kept abstracts are indexed, with a bucket per band
+    and band hash.
+    '''
+
+    def __init__(self, threshold, num_perm = NUM_PERM):
+
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.doc_ids = []
+        self.signatures = []
+
+    def band_keys(self, signature):
+
+        band_rows = signature[:self.bands * self.rows].reshape(self.bands, self.rows)
+
+        return [band.tobytes() for band in band_rows]
+
+    def add(self, doc_id, signature):
+
+        '''
+        Adds an abstract to the index if it is not a near duplicate of an
+        abstract that was added before. Returns the doc_id of the abstract it
+        is a near duplicate of and their estimated Jaccard similarity, or
+        None and None when it is kept.
+        '''
+
+        keys = self.band_keys(signature)
+        candidates = set()
+        for bucket, key in zip(self.buckets, keys):
+            candidates.update(bucket.get(key, ()))
+
+        if candidates:
+            candidates = sorted(candidates)
+            similarities = (numpy.stack([self.signatures[candidate]
+                                         for candidate in candidates])
+                            == signature).mean(axis = 1)
+            best = int(similarities.argmax())
+            if similarities[best] >= self.threshold:
+                return self.doc_ids[candidates[best]], float(similarities[best])
+
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.signatures.append(signature)
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, []).append(position)
+
+        return None, None
+
+def find_near_duplicates(doc_ids, texts, threshold, num_perm = NUM_PERM):
+
+    '''
+    Finds the near duplicates among the texts, which are looked at in doc_id
+    order. Returns the cluster report with a row per near duplicate: its
+    doc_id, the doc_id of the kept abstract of its cluster (duplicate_of)
+    and their estimated Jaccard similarity.
+    '''
+
+    hasher = MinHasher(num_perm)
+    index = NearDuplicateIndex(threshold, num_perm)
+    report = []
+
+    for doc_id, text in sorted(zip(doc_ids, texts)):
+        duplicate_of, similarity = index.add(doc_id, hasher.signature(text))
+        if duplicate_of is not None:
+            report.append((doc_id, duplicate_of, similarity))
+
+    return near_duplicate_report(report)
+
+def near_duplicate_report(report):
+
+    return pandas.DataFrame(report, columns = ['doc_id', 'duplicate_of', 'jaccard'])
+
+def summarize_near_duplicates(report):
+
+    '''
+    Gives a line with the number of near duplicates and clusters
+    '''
+
+    if report.empty:
+        return 'No near duplicates are found'
+
+    cluster_sizes = report['duplicate_of'].value_counts() + 1
+
+    return ('{} near duplicates are dropped from {} clusters, the largest cluster '
+            'has {} abstracts'.format(len(report), len(cluster_sizes),
+                                      cluster_sizes.max()))
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 00:48:19 2026
+
+This script contains the filter of the abstracts that are notices instead of
+abstracts of articles, such as corrections, retractions and amendments. The
+literal patterns of all rules are searched in a single scan of the lowercased
+abstract, instead of once per pattern with str.contains, and the filter tells
+which rule and pattern fired. For a handful of patterns the scan is one
+compiled alternation of the re module. The re module tries every pattern at
+every position that starts like one of them, so from AUTOMATON_MIN_PATTERNS
+patterns on they are compiled into an Aho-Corasick automaton over the UTF-8
+bytes of the abstract instead, of which the time does not grow with the
+number of patterns.
+
+The rules are given as a dictionary from the name of a rule to its patterns,
+NOTICE_RULES by default, or read from a csv file with a rule and a pattern
+column, so the pattern list can grow without changing the code.
+"""
+
+import re
+import pandas
+from aho_corasick_funcs import AhoCorasickAutomaton
+
+NOTICE_RULES = {'correction': ['this corrects the article'],
+                'retraction': ['this retracts the article'],
+                'amendment': ['an amendment to this paper']}
+
+# Number of patterns from which the automaton scans faster than the alternation,
+# see Benchmark_notice_filter.py
+AUTOMATON_MIN_PATTERNS = 16
+
+def load_notice_rules(path):
+
+    '''
+    Reads the rules from a csv file with a row per pattern, in the columns
+    rule and pattern
+    '''
+
+    rules = {}
+    for rule, pattern in pandas.read_csv(path)[['rule', 'pattern']].itertuples(index = False):
+        rules.setdefault(rule, []).append(pattern)
+
+    return rules
+
+class NoticeFilter:
+
+    '''
+    Alternation or, from automaton_min_patterns patterns on, Aho-Corasick
+    automaton of the lowercased patterns of the rules, see
+    aho_corasick_funcs.py. A pattern of more than one rule belongs to the
+    first of them.
+    '''
+
+    def __init__(self, rules = NOTICE_RULES,
+                 automaton_min_patterns = AUTOMATON_MIN_PATTERNS):
+
+        self.pattern_rules = {}
+        for rule, patterns in rules.items():
+            for pattern in patterns:
+                self.pattern_rules.setdefault(pattern.lower(), rule)
+
+        self.regex = None
+        self.automaton = None
+
+        if len(self.pattern_rules) < automaton_min_patterns:
+            # Longest first, so a pattern does not hide a longer one that
+            # starts at the same position
+            self.regex = re.compile('|'.join(
+                re.escape(pattern) for pattern
+                in sorted(self.pattern_rules, key = len, reverse = True)))
+        else:
+            self.automaton = AhoCorasickAutomaton(
+                (rule, pattern.encode('utf-8'))
+                for pattern, rule in self.pattern_rules.items())
+
+    def match(self, text):
+
+        '''
+        Gives the rule and the pattern of the first pattern that is found in
+        the lowercased text, or None when no pattern is in it. The alternation
+        finds the pattern that starts first, the automaton the one that ends
+        first.
+        '''
+
+        if self.regex is not None:
+            notice = self.regex.search(text.lower())
+            if notice is None:
+                return None
+
+            return self.pattern_rules[notice.group()], notice.group()
+
+        notice = self.automaton.first_match(text.lower().encode('utf-8'))
+        if notice is None:
+            return None
+
+        return notice[0], notice[1].decode('utf-8')
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:37:45 2026
+
+This script contains functions to build the EuropePMC queries, to plan them
+into a few larger OR-combined queries and to evaluate the queries locally on
+the title, abstract and keywords of an article. The local evaluation tells us
+which of the original queries an article harvested with a planned query
+matches, so the query attribution and provenance can be reconstructed
+without running every original query against the server. The queries can
+also be evaluated on the whole stored corpus at once, through an inverted
+index of its words.
+"""
+
+import re
+import bisect
+import functools
+import numpy
+from urllib.parse import unquote
+
+QUERY_FIELDS = ['ABSTRACT', 'TITLE', 'KW']
+
+# *************
+# Building queries
+# *************
+
+def format_term(term):
+
+    '''
+    Note that %20 should be used instead of a space in these queries, and
+    terms with a space are put between quotes to search them as a phrase
+    '''
+
+    if(" " in term):
+        return '"' + term.replace(" ", "%20") + '"'
+
+    return term
+
+def fields_clause(terms):
+
+    '''
+    Searches each of the terms in the abstract, title and keywords
+    '''
+
+    return "%20OR%20".join("{}:{}".format(field, format_term(term))
+                           for term in terms for field in QUERY_FIELDS)
+
+def build_query(pub_h_terms, chem_h_terms):
+
+    '''
+    Combines the public health terms with the chemical hazard terms. With a
+    single term on both sides this is exactly one of the original queries.
+    '''
+
+    return "({})%20AND%20({})".format(fields_clause(pub_h_terms),
+                                      fields_clause(chem_h_terms))
+
+# *************
+# Planning queries
+# *************
+
+def chunk_terms(terms, max_clause_length):
+
+    '''
+    Greedily splits the terms into consecutive chunks whose fields clause
+    fits in max_clause_length characters
+    '''
+
+    chunks = [[]]
+    for term in terms:
+        if chunks[-1] and len(fields_clause(chunks[-1] + [term])) > max_clause_length:
+            chunks.append([])
+        chunks[-1].append(term)
+
+    return chunks
+
+def plan_queries(public_health, chem_hazard, max_query_length = 1500):
+
+    '''
+    Groups the cross product of public health and chemical hazard terms into
+    a few OR-combined queries of at most max_query_length characters. Every
+    planned query covers a block of the cross product, and the union of the
+    blocks is the whole cross product. Returns a list of (planned query,
+    indices of the original queries it covers), where the original queries
+    are numbered as in the nested loop over public_health and chem_hazard.
+    '''
+
+    overhead = len(build_query([], []))
+    budget = max_query_length - overhead
+
+    # Keep all chemical hazard terms together if we still have room to add
+    # a public health term, otherwise split them up as well
+    chem_chunks = chunk_terms(chem_hazard, budget // 2)
+    if len(chem_chunks) == 1:
+        chem_budget = len(fields_clause(chem_hazard))
+    else:
+        chem_budget = budget // 2
+
+    plan = []
+    for chem_chunk in chem_chunks:
+        for pub_chunk in chunk_terms(public_health, budget - chem_budget):
+            covered = [public_health.index(pub_h) * len(chem_hazard) +
+                       chem_hazard.index(chem_h)
+                       for pub_h in pub_chunk for chem_h in chem_chunk]
+            plan.append((build_query(pub_chunk, chem_chunk), sorted(covered)))
+
+    return plan
+
+# *************
+# Parsing queries
+# *************
+
+def tokenize_query(query):
+
+    '''
+    Splits a (%20 encoded) query into parentheses, operators and
+    field:value terms
+    '''
+
+    return re.findall(r'\(|\)|\bAND\b|\bOR\b|[A-Z_]+:(?:"[^"]*"|[^\s()]+)',
+                      unquote(query))
+
+def parse_query(query):
+
+    '''
+    Parses a query into nested tuples: ('OR', children), ('AND', children) or
+    ('TERM', field, words). The words of a term are lower case and may end
+    with * for truncation. AND binds stronger than OR.
+    '''
+
+    tokens = tokenize_query(query)
+    position = 0
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while position < len(tokens) and tokens[position] == 'OR':
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('OR', tuple(children))
+
+    def parse_and():
+        nonlocal position
+        children = [parse_atom()]
+        while position < len(tokens) and tokens[position] == 'AND':
+            position += 1
+            children.append(parse_atom())
+        return children[0] if len(children) == 1 else ('AND', tuple(children))
+
+    def parse_atom():
+        nonlocal position
+        token = tokens[position]
+        position += 1
+        if token == '(':
+            node = parse_or()
+            if tokens[position] != ')':
+                raise ValueError('Unbalanced parentheses in query {}'.format(query))
+            position += 1
+            return node
+        field, value = token.split(':', 1)
+        return ('TERM', field, tuple(re.findall(r'[a-z0-9]+\*?',
+                                                value.lower())))
+
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError('Could not parse query {}'.format(query))
+
+    return node
+
+# *************
+# Evaluating queries on an article
+# *************
+
+def tokenize_text(text):
+
+    '''
+    Lower cases the text, drops the html tags and splits it into words
+    '''
+
+    return re.findall(r'[a-z0-9]+', re.sub(r'<[^>]+>', ' ', str(text).lower()))
+
+def article_fields(result):
+
+    '''
+    Gets the tokens of the searched fields of a EuropePMC result. Every
+    keyword is kept separately so a phrase can not run across two keywords.
+    '''
+
+    keywords = result.get('keywordList', {}).get('keyword', [])
+
+    return {'ABSTRACT': [tokenize_text(result.get('abstractText', ''))],
+            'TITLE': [tokenize_text(result.get('title', ''))],
+            'KW': [tokenize_text(keyword) for keyword in keywords]}
+
+def word_matches(word, token):
+
+    if word.endswith('*'):
+        return token.startswith(word[:-1])
+
+    return token == word
+
+def phrase_in_tokens(words, tokens):
+
+    for start in range(len(tokens) - len(words) + 1):
+        if all(word_matches(word, tokens[start + offset])
+               for offset, word in enumerate(words)):
+            return True
+
+    return False
+
+def match_query(node, fields, memo = None):
+
+    '''
+    Evaluates a parsed query on the fields of an article. The memo keeps the
+    outcome of every term, so terms shared between queries are only looked
+    up once per article.
+    '''
+
+    if memo is None:
+        memo = {}
+
+    if node[0] == 'TERM':
+        if node not in memo:
+            memo[node] = any(phrase_in_tokens(node[2], tokens)
+                             for tokens in fields.get(node[1], []))
+        return memo[node]
+
+    if node[0] == 'AND':
+        return all(match_query(child, fields, memo) for child in node[1])
+
+    return any(match_query(child, fields, memo) for child in node[1])
+
+def matching_queries(result, original_queries, parsed_queries):
+
+    '''
+    Gives all original queries that the article matches locally, in the order
+    of the original queries, so the first one is the query a sequential
+    harvest over the original queries would have found it with. The list is
+    empty when no query matches locally, e.g. because the server also
+    searched synonyms of the terms.
+    '''
+
+    fields = article_fields(result)
+    memo = {}
+
+    return [query for query, parsed_query in zip(original_queries, parsed_queries)
+            if match_query(parsed_query, fields, memo)]
+
+# *************
+# Evaluating queries on the corpus
+# *************
+
+class CorpusIndex:
+
+    '''
+    Positional inverted index of the searched fields of a corpus, so a query
+    is evaluated by looking up the articles of its terms instead of by
+    matching every article. The tokens of all articles are laid out one
+    after the other per field, with a gap between articles and between
+    keywords, so a phrase can not run across two of them. A term is found
+    by intersecting the positions of its words, shifted by their place in
+    the phrase, and a truncated word takes the positions of all tokens that
+    start with it, which are next to each other in the sorted vocabulary.
+    The outcome is the same as of match_query on every article.
+    '''
+
+    def __init__(self, articles):
+
+        '''
+        articles is a dataframe with the columns row_id, title, abstract
+        and keywords, e.g. from load_corpus
+        '''
+
+        self.fields = {}
+
+        texts = {'ABSTRACT': [[text] for text in articles['abstract']],
+                 'TITLE': [[text] for text in articles['title']],
+                 'KW': [list(keywords) if keywords is not None else []
+                        for keywords in articles['keywords']]}
+
+        for field in QUERY_FIELDS:
+            self.fields[field] = self.index_field(texts[field],
+                                                  articles['row_id'].to_numpy())
+
+    @staticmethod
+    def index_field(segments_per_article, row_ids):
+
+        tokens = []
+        position_rows = []
+
+        for segments, row_id in zip(segments_per_article, row_ids):
+            for text in segments:
+                segment = tokenize_text(text) if isinstance(text, str) else []
+                tokens += segment + [None]
+                position_rows += [row_id] * (len(segment) + 1)
+
+        vocabulary = sorted(set(token for token in tokens if token is not None))
+        token_ids = {token: token_id for token_id, token in enumerate(vocabulary)}
+
+        # The gaps get an id past the vocabulary, so they sort last
+        position_tokens = numpy.array([len(vocabulary) if token is None
+                                       else token_ids[token] for token in tokens],
+                                      dtype = numpy.int64)
+        order = numpy.argsort(position_tokens, kind = 'stable')
+        starts = numpy.searchsorted(position_tokens[order],
+                                    numpy.arange(len(vocabulary) + 1))
+
+        return {'vocabulary': vocabulary, 'order': order, 'starts': starts,
+                'rows': numpy.array(position_rows, dtype = numpy.int64)}
+
+    def word_positions(self, field, word):
+
+        '''
+        Gives the sorted positions of the tokens that match the word
+        '''
+
+        index = self.fields[field]
+
+        if word.endswith('*'):
+            first = bisect.bisect_left(index['vocabulary'], word[:-1])
+            last = bisect.bisect_left(index['vocabulary'], word[:-1] + '\uffff')
+            return numpy.sort(index['order'][index['starts'][first]:
+                                             index['starts'][last]])
+
+        token_id = bisect.bisect_left(index['vocabulary'], word)
+        if (token_id == len(index['vocabulary']) or
+            index['vocabulary'][token_id] != word):
+            return numpy.array([], dtype = numpy.int64)
+
+        return index['order'][index['starts'][token_id]:
+                              index['starts'][token_id + 1]]
+
+    def term_rows(self, field, words):
+
+        '''
+        Gives the sorted row ids of the articles in which the phrase is found
+        '''
+
+        if field not in self.fields or not words:
+            return numpy.array([], dtype = numpy.int64)
+
+        positions = self.word_positions(field, words[0])
+        for offset, word in enumerate(words[1:], 1):
+            positions = numpy.intersect1d(
+                positions, self.word_positions(field, word) - offset,
+                assume_unique = True)
+
+        return numpy.unique(self.fields[field]['rows'][positions])
+
+    def evaluate(self, node, memo = None):
+
+        '''
+        Gives the sorted row ids of the articles that match a parsed query.
+        The memo keeps the rows of every term, so terms shared between
+        queries are only looked up once.
+        '''
+
+        if memo is None:
+            memo = {}
+
+        if node[0] == 'TERM':
+            if node not in memo:
+                memo[node] = self.term_rows(node[1], node[2])
+            return memo[node]
+
+        rows = [self.evaluate(child, memo) for child in node[1]]
+
+        if node[0] == 'AND':
+            return functools.reduce(numpy.intersect1d, rows)
+
+        return functools.reduce(numpy.union1d, rows)
+
+    def select(self, queries):
+
+        '''
+        Evaluates every query on the corpus and gives the row ids per query
+        '''
+
+        memo = {}
+
+        return [self.evaluate(parse_query(query), memo) for query in queries]
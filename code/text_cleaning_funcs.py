@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 21:26:37 2026
+
+This script contains the text cleaning of the abstracts before they are
+tokenized. The cleaning rules are the ones of the chain of str.replace and
+re.sub calls we used in Clean_abstracts.py, but the patterns are compiled
+once when the module is imported, rules that can not affect each other are
+combined into a single pass, and a pass is skipped when the characters it
+needs are not in the abstract at all. The html tags are still removed one
+after the other, as removing one tag can make another, e.g. <h4<b>> becomes
+<h4>. Benchmark_clean_text.py checks that
+the output is identical to the chain of substitutions and times both.
+Only the parentheticals are removed differently from that chain: they are
+matched by depth in linear time instead of by a regular expression.
+
+The abstracts for the LLM are cleaned with clean_text_for_llm, which keeps the
+text closer to natural language in its written form and only uses a part of
+the same rules.
+"""
+
+import re
+
+# The inline html tags are dropped and the section headers are replaced by a
+# space. Make sure that the header is not a greedy capture.
+INLINE_TAGS = ['<i>', '<b>', '</i>', '</b>', '<sub>', '</sub>', '<sup>', '</sup>']
+HEADER = re.compile(r'<h4>.*?</h4>')
+
+#A parenthetical is removed if it contains something that is not a letter,
+#a number, a plus, a minus or space. We allow for these to keep potential
+#abbreviations of chemicals that are in a paranthesis.
+#A sample expression that we would want to remove: (95%ci: 1.04%-45.66%)
+#The parantheses are matched by depth, see remove_parentheticals, so that a
+#nested expression such as (odds ratio (or) 10, 95% confidence interval (ci))
+#is removed as a whole, and an unbalanced paranthesis is kept as a character.
+PARANTHESIS = re.compile(r'[()]')
+NOT_ABBREVIATION = re.compile(r'[^\d+\-\s()a-z]')
+
+#Comma should have spaces on both sides in case they do not. The whitespace
+#in front of the comma is checked by replace_comma, because a pattern that
+#starts with the comma is found much faster than one that starts with a
+#lookbehind.
+COMMA = re.compile(r',\s')
+
+#There should be single spaces between tokens. If there is a period, it
+#should not have a space on its left side. Whitespace in front of a period
+#is dropped and any other run of whitespace becomes a single space, which
+#also leaves no run of whitespace after a period.
+PERIOD = re.compile(r'\.(?!\d+|\s)')
+WHITESPACE = re.compile(r'\s(?:\s*(\.)|\s+)')
+
+#Also make sure that the opening parantheses do not have space after and
+#closing parantheses do not have space before themselves.
+PARANTHESIS_SPACE = re.compile(r'(\()\s+|\s+(\))')
+
+#Remove the copyright declarations at the end of abstract.
+#We introduce character limit that can follow the keyword copyright or
+#copyright sign because otherwise we can delete copyright and everything that
+#follows because it is mentioned in an abstract
+#The space in {0, 50} makes it a literal text instead of a limit, so COPYRIGHT
+#hardly ever matches. This is kept on purpose, the token dataframes and the
+#LLM outputs were made with it, and with {0,50} the 50 characters after every
+#mention of copyright in an abstract would be dropped.
+PROTECTED_BY_COPYRIGHT = re.compile("this article is protected by copyright. all rights reserved.")
+COPYRIGHT = re.compile(r'copyright(.){0, 50}')
+COPYRIGHT_SIGN = re.compile(r'(?:copyright)*[:\s]*©.{0,50}')
+
+def remove_tags_and_headers(text):
+
+    for tag in INLINE_TAGS:
+        text = text.replace(tag, '')
+
+    return HEADER.sub(' ', text)
+
+def replace_comma(match):
+
+    start = match.start()
+    if start > 0 and match.string[start - 1].isspace():
+        return match.group()
+
+    return ' , '
+
+def replace_whitespace(match):
+
+    return '.' if match.group(1) else ' '
+
+def remove_parentheticals(text):
+
+    '''
+    Removes the outermost balanced parentheticals that contain a character
+    that can not be part of an abbreviation. The parantheses are paired with
+    a stack in one pass over their positions, and every character is checked
+    at most once, so the runtime is linear in the length of the text also
+    when it has many unbalanced parantheses, where the lazy quantifiers of
+    the regular expression we used before backtracked for ages.
+    '''
+
+    open_positions = []
+    groups = []
+
+    for match in PARANTHESIS.finditer(text):
+        if match.group() == '(':
+            open_positions.append(match.start())
+        elif open_positions:
+            start = open_positions.pop()
+            # The groups inside this one are replaced by it
+            while groups and groups[-1][0] > start:
+                groups.pop()
+            groups.append((start, match.end()))
+
+    # Groups in an unbalanced opening paranthesis are outermost ones
+    parts = []
+    end = 0
+    for group_start, group_end in groups:
+        if NOT_ABBREVIATION.search(text, group_start, group_end):
+            parts.append(text[end:group_start])
+            end = group_end
+
+    if not parts:
+        return text
+
+    parts.append(text[end:])
+
+    return ''.join(parts)
+
+def clean_text(text):
+
+    '''
+    Does cleaning operations on filtered abstracts before they are tokenized
+    and a dataframe containing all tokens in the corpus is built
+    '''
+
+    text = text.lower()
+
+    if '<' in text:
+        text = remove_tags_and_headers(text)
+
+    if '(' in text:
+        text = remove_parentheticals(text)
+
+    if ',' in text:
+        text = COMMA.sub(replace_comma, text)
+
+    if '.' in text:
+        text = PERIOD.sub('. ', text)
+
+    text = WHITESPACE.sub(replace_whitespace, text)
+
+    if '(' in text or ')' in text:
+        text = PARANTHESIS_SPACE.sub(r'\1\2', text)
+
+    if 'copyright' in text:
+        text = PROTECTED_BY_COPYRIGHT.sub('', text)
+        text = COPYRIGHT.sub('', text)
+
+    if '©' in text:
+        text = COPYRIGHT_SIGN.sub('', text)
+
+    return text.strip()
+
+def clean_text_for_llm(text):
+
+    '''
+    We have a different text cleaning function for the LLM because it can
+    handle the intricacies of natural language better than a word embedding
+    model does. (These intricacies can sometimes be even helpful) The case,
+    the parentheticals and the spaces around commas and parantheses are kept.
+    '''
+
+    if '<' in text:
+        text = remove_tags_and_headers(text)
+
+    if '.' in text:
+        text = PERIOD.sub('. ', text)
+
+    text = WHITESPACE.sub(replace_whitespace, text)
+
+    if 'copyright' in text:
+        text = PROTECTED_BY_COPYRIGHT.sub('', text)
+        text = COPYRIGHT.sub('', text)
+
+    if '©' in text:
+        text = COPYRIGHT_SIGN.sub('', text)
+
+    return text.strip()